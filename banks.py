@@ -0,0 +1,445 @@
+## Runs several independent elevator banks (i.e. the banks of a campus, or the
+## low/high rise banks of a tower) in lockstep, with each bank in its own worker
+## process.
+##
+## - every tick, each worker writes the state of its cars into a shared memory
+##   array, which the coordinator (or a renderer) reads without pickling.
+## - passengers transferring between banks (sky lobby handoffs) go through
+##   lock-free ring buffers in the same shared memory.
+
+import multiprocessing
+import random
+from multiprocessing import shared_memory
+
+from elevator import ELEVATOR_NUMBER, Building, TransportSystem
+
+
+# Constants
+
+# Car state -> one row of doubles for each car
+HEIGHT = 0 # the last floor the car handshaked
+DIRECTION = 1 # 1 for up, -1 for down, 0 for stationary
+OPENED = 2 # 1 if the doors are open, 0 otherwise
+STOPS = 3 # the number of floors the car needs to visit
+POSITION = 4 # the elevation of the car in metres (NaN if not known)
+CAR_FIELDS = 5
+DIRECTION_CODES = {'U' : 1, 'D' : -1, None : 0}
+
+# Transfers -> one record of integers for each passenger
+SOURCE = 0 # the bank the passenger is leaving
+TARGET = 1 # the bank the passenger is transferring to
+TICK = 2 # the tick the passenger left on
+TRANSFER_FIELDS = 3
+RING_SLOTS = 4096 # the number of transfers a ring buffer can hold
+
+BARRIER_TIMEOUT = 60 # seconds to wait for the other banks before giving up
+
+
+class Bank :
+    """Describes an elevator bank, so a worker process can build it."""
+
+    def __init__(self, lowest, highest, cars=ELEVATOR_NUMBER, lobby=None,
+                 requests=1, transferRate=0, seed=None, profile=None) :
+        """Creates a bank.
+
+        Parameters:
+            lowest (int) -> the lowest floor the bank serves.
+            highest (int) -> the highest floor the bank serves.
+            cars (int) -> the number of elevators in the bank.
+            lobby (int) -> the sky lobby, where passengers transfer between
+                           banks. If not given, the lowest floor.
+            requests (int) -> the number of requests to add each tick.
+            transferRate (float) -> the chance that a passenger getting off at
+                                    the lobby transfers to another bank (once
+                                    they've got off there).
+            seed (int) -> the seed for the bank's random requests.
+            profile (MotionProfile) -> the motion profile of the bank's cars.
+        """
+        self.lowest = lowest
+        self.highest = highest
+        self.cars = cars
+        self.requests = requests
+        self.transferRate = transferRate
+        self.seed = seed
+        self.profile = profile
+
+        if lobby is None :
+            self.lobby = lowest
+        else :
+            self.lobby = lobby
+
+    def make_system(self) :
+        """Creates the transport system for the bank.
+        """
+        return TransportSystem(building=Building(lowest=self.lowest,
+                                                 highest=self.highest),
+                               display=False, profile=self.profile,
+                               elevatorNumber=self.cars)
+
+
+class LobbyRiders :
+    """Keeps track of the passengers riding each car to the sky lobby, so they
+    only transfer once they've got off there."""
+
+    def __init__(self, lobby) :
+        """Creates an empty tracker.
+
+        Parameters:
+            lobby (Floor) -> the sky lobby.
+        """
+        self.lobby = lobby
+        self.riding = {}
+
+    def update(self, system, completed) :
+        """Boards the passengers heading for the lobby, then returns the
+        passengers who got off at the lobby during the last tick.
+
+        Parameters:
+            system (TransportSystem) -> the bank's transport system.
+            completed (List<Request>) -> the requests completed during the last
+                                         tick.
+        """
+        for request in completed :
+            for passenger in request.get_passengers() :
+                if passenger.get_destination() == self.lobby :
+                    self.riding.setdefault(request.get_elevator(),
+                                           []).append(passenger)
+
+        alighted = []
+        for elevator, floor in system.get_openings() :
+            if floor == self.lobby and elevator in self.riding :
+                alighted.extend(self.riding.pop(elevator))
+
+        return alighted
+
+    def get_riding(self) :
+        """Returns the number of passengers riding to the lobby.
+        """
+        return sum(len(passengers) for passengers in self.riding.values())
+
+
+class RingBuffer :
+    """Lock-free ring buffer of fixed size integer records, for exactly one
+    producer and one consumer."""
+
+    def __init__(self, buffer, slots, fields) :
+        """Creates a ring buffer over some (shared) memory.
+
+        Parameters:
+            buffer (memoryview) -> the memory for the ring buffer (of
+                                   RingBuffer.size(slots, fields) bytes).
+            slots (int) -> the number of records the buffer can hold.
+            fields (int) -> the number of integers in each record.
+        """
+        self.slots = slots
+        self.fields = fields
+
+        # The head is only written by the producer, and the tail only by the
+        # consumer, so neither needs a lock
+        self.counters = buffer[:16].cast('q')
+        self.records = buffer[16:].cast('q')
+
+    @staticmethod
+    def size(slots, fields) :
+        """Returns the number of bytes a ring buffer needs.
+
+        Parameters:
+            slots (int) -> the number of records the buffer can hold.
+            fields (int) -> the number of integers in each record.
+        """
+        return 16 + slots * fields * 8
+
+    def push(self, record) :
+        """Adds a record to the buffer (producer only).
+
+        Returns True if the record was added, False if the buffer is full.
+
+        Parameters:
+            record (Tuple<int>) -> the record to add.
+        """
+        head = self.counters[0]
+        if head - self.counters[1] >= self.slots :
+            return False
+
+        # Write the record before publishing it by moving the head
+        base = (head % self.slots) * self.fields
+        for field, value in enumerate(record) :
+            self.records[base + field] = value
+
+        self.counters[0] = head + 1
+        return True
+
+    def pop(self) :
+        """Removes and returns the oldest record (consumer only), or None if the
+        buffer is empty.
+        """
+        tail = self.counters[1]
+        if tail == self.counters[0] :
+            return None
+
+        base = (tail % self.slots) * self.fields
+        record = tuple(self.records[base:base + self.fields])
+
+        self.counters[1] = tail + 1
+        return record
+
+    def drain(self) :
+        """Removes and returns every record in the buffer (consumer only).
+        """
+        records = []
+        record = self.pop()
+        while record is not None :
+            records.append(record)
+            record = self.pop()
+
+        return records
+
+    def release(self) :
+        """Releases the views of the memory (so the memory can be closed).
+        """
+        self.counters.release()
+        self.records.release()
+
+
+class SharedState :
+    """Layout of the shared memory used by the coordinator and the banks."""
+
+    def __init__(self, memory, banks, maxCars) :
+        """Creates views of the shared memory.
+
+        Parameters:
+            memory (SharedMemory) -> the shared memory.
+            banks (int) -> the number of banks.
+            maxCars (int) -> the most cars in any bank.
+        """
+        self.memory = memory
+        self.maxCars = maxCars
+
+        stateSize = SharedState.state_size(banks, maxCars)
+        ringSize = RingBuffer.size(RING_SLOTS, TRANSFER_FIELDS)
+
+        self.states = memory.buf[:stateSize].cast('d')
+
+        # Each bank has an outbox (the bank produces, the coordinator consumes)
+        # and an inbox (the coordinator produces, the bank consumes)
+        self.outboxes = []
+        self.inboxes = []
+        for bank in range(banks) :
+            start = stateSize + 2 * bank * ringSize
+            self.outboxes.append(RingBuffer(memory.buf[start:start + ringSize],
+                                            RING_SLOTS, TRANSFER_FIELDS))
+            self.inboxes.append(RingBuffer(
+                memory.buf[start + ringSize:start + 2 * ringSize],
+                RING_SLOTS, TRANSFER_FIELDS))
+
+    @staticmethod
+    def state_size(banks, maxCars) :
+        """Returns the number of bytes for the state of every car.
+
+        Parameters:
+            banks (int) -> the number of banks.
+            maxCars (int) -> the most cars in any bank.
+        """
+        return banks * maxCars * CAR_FIELDS * 8
+
+    @staticmethod
+    def size(banks, maxCars) :
+        """Returns the number of bytes of shared memory needed.
+
+        Parameters:
+            banks (int) -> the number of banks.
+            maxCars (int) -> the most cars in any bank.
+        """
+        return SharedState.state_size(banks, maxCars) + \
+               2 * banks * RingBuffer.size(RING_SLOTS, TRANSFER_FIELDS)
+
+    def write_cars(self, bank, elevators) :
+        """Writes the state of a bank's cars.
+
+        Parameters:
+            bank (int) -> the index of the bank.
+            elevators (List<Elevator>) -> the cars in the bank.
+        """
+        states = self.states
+        for car, elevator in enumerate(elevators) :
+            base = (bank * self.maxCars + car) * CAR_FIELDS
+            position = elevator.get_position()
+
+            states[base + HEIGHT] = elevator.get_last_floor().get_height()
+            states[base + DIRECTION] = DIRECTION_CODES[elevator.get_direction()]
+            states[base + OPENED] = elevator.get_opened()
+            states[base + STOPS] = elevator.get_stop_count()
+            states[base + POSITION] = float('nan') if position is None \
+                                      else position
+
+    def read_car(self, bank, car) :
+        """Returns the state of a car, copied from its row of the shared memory
+        (indexed by HEIGHT, DIRECTION, OPENED, STOPS and POSITION). A copy is
+        returned, so no views of the memory are left to stop it being closed.
+
+        Parameters:
+            bank (int) -> the index of the bank.
+            car (int) -> the index of the car in the bank.
+        """
+        base = (bank * self.maxCars + car) * CAR_FIELDS
+        return tuple(self.states[base:base + CAR_FIELDS])
+
+    def release(self) :
+        """Releases the views of the memory (so the memory can be closed).
+        """
+        self.states.release()
+        for ring in self.outboxes + self.inboxes :
+            ring.release()
+
+
+def run_bank(memoryName, index, bank, banks, maxCars, steps, barrier) :
+    """Worker process -> ticks one bank in lockstep with the other banks.
+
+    Parameters:
+        memoryName (str) -> the name of the shared memory.
+        index (int) -> the index of this bank.
+        bank (Bank) -> the bank to simulate.
+        banks (int) -> the number of banks.
+        maxCars (int) -> the most cars in any bank.
+        steps (int) -> the number of ticks to simulate.
+        barrier (Barrier) -> keeps the banks and the coordinator in lockstep.
+    """
+    memory = shared_memory.SharedMemory(name=memoryName)
+    state = SharedState(memory, banks, maxCars)
+    inbox = state.inboxes[index]
+    outbox = state.outboxes[index]
+
+    try :
+        random.seed(bank.seed)
+        system = bank.make_system()
+        riders = LobbyRiders(system.floorDetails[bank.lobby])
+        otherBanks = [other for other in range(banks) if other != index]
+
+        for tick in range(steps) :
+            barrier.wait(BARRIER_TIMEOUT)
+
+            # Passengers arriving from other banks request from the lobby
+            for _ in inbox.drain() :
+                system.add_request({bank.lobby : 1})
+
+            completed = system.simulation_step(bank.requests)
+
+            # Passengers getting off at the lobby might be transferring
+            if otherBanks :
+                for _ in riders.update(system, completed) :
+                    if random.random() < bank.transferRate :
+                        outbox.push((index, random.choice(otherBanks), tick))
+
+            state.write_cars(index, system.get_elevators())
+            barrier.wait(BARRIER_TIMEOUT)
+
+    except :
+        # Don't leave the other banks waiting for this one
+        barrier.abort()
+        raise
+
+    finally :
+        state.release()
+        memory.close()
+
+
+class BankCoordinator :
+    """Runs each elevator bank in its own worker process, with the ticks of
+    every bank kept in lockstep."""
+
+    def __init__(self, banks) :
+        """Creates a coordinator.
+
+        Parameters:
+            banks (List<Bank>) -> the banks to simulate.
+        """
+        self.banks = banks
+        self.maxCars = max(bank.cars for bank in banks)
+        self.transfers = 0
+        self.dropped = 0
+
+        self.memory = shared_memory.SharedMemory(
+            create=True, size=SharedState.size(len(banks), self.maxCars))
+        self.state = SharedState(self.memory, len(banks), self.maxCars)
+
+    def get_banks(self) :
+        """Returns the banks being simulated.
+        """
+        return self.banks
+
+    def get_car_state(self, bank, car) :
+        """Returns the state of a car (indexed by HEIGHT, DIRECTION, OPENED,
+        STOPS and POSITION), copied from the shared memory.
+
+        Parameters:
+            bank (int) -> the index of the bank.
+            car (int) -> the index of the car in the bank.
+        """
+        return self.state.read_car(bank, car)
+
+    def get_transfers(self) :
+        """Returns the number of passengers which have transferred between banks
+        (and the number dropped because a bank's inbox was full).
+        """
+        return self.transfers, self.dropped
+
+    def route_transfers(self) :
+        """Moves the transferring passengers from each bank's outbox to the inbox
+        of the bank they are transferring to.
+        """
+        for outbox in self.state.outboxes :
+            for record in outbox.drain() :
+                if self.state.inboxes[record[TARGET]].push(record) :
+                    self.transfers += 1
+                else :
+                    self.dropped += 1
+
+    def run(self, steps, callback=None) :
+        """Simulates every bank for a number of ticks.
+
+        Parameters:
+            steps (int) -> the number of ticks to simulate.
+            callback (Function) -> called with the tick and the coordinator once
+                                   every bank has finished each tick (i.e. to
+                                   render the cars).
+        """
+        barrier = multiprocessing.Barrier(len(self.banks) + 1)
+        workers = []
+        for index, bank in enumerate(self.banks) :
+            workers.append(multiprocessing.Process(
+                target=run_bank, args=(self.memory.name, index, bank,
+                                       len(self.banks), self.maxCars, steps,
+                                       barrier)))
+
+        for worker in workers :
+            worker.start()
+
+        try :
+            for tick in range(steps) :
+                # Let the banks tick, then wait until they have all finished
+                barrier.wait(BARRIER_TIMEOUT)
+                barrier.wait(BARRIER_TIMEOUT)
+
+                # Transfers are routed between ticks, so they reach their bank
+                # on the next tick
+                self.route_transfers()
+
+                if callback is not None :
+                    callback(tick, self)
+
+        except :
+            barrier.abort()
+            raise
+
+        finally :
+            for worker in workers :
+                worker.join()
+
+    def close(self) :
+        """Frees the shared memory (it's unlinked even if it can't be closed).
+        """
+        try :
+            self.state.release()
+            self.memory.close()
+        finally :
+            self.memory.unlink()
@@ -0,0 +1,438 @@
+## Command line interface -> python -m elevator <command> [options]
+##
+## - run        simulates a seeded workload (which can be recorded).
+## - replay     simulates a recorded workload.
+## - benchmark  times each tick of a seeded workload.
+## - sweep      simulates the same workload for a range of elevator numbers.
+## - tournament simulates dispatch policies head to head on the same workloads.
+## - tune       searches for the dispatch parameters with the lowest p90 wait.
+##
+## Anything not needed to start simulating (json, csv, NumPy, telemetry, ...) is
+## only imported by the options that use it, so short runs start quickly.
+
+import argparse
+import random
+import sys
+from time import perf_counter
+
+from elevator import Building, MotionProfile, TransportSystem
+from workload import check_workload, generate_workload, load_settings, \
+                     load_workload, run_workload, save_workload
+
+
+# Constants
+PERCENTILES = (50, 90, 99)
+
+
+def parse_args(args=None) :
+    """Returns the parsed command line options.
+
+    Parameters:
+        args (List<str>) -> the command line (if not given, sys.argv).
+    """
+    parser = argparse.ArgumentParser(prog="python -m elevator",
+                                     description="Simulates elevator scheduling.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    # Options shared by every command
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--lowest", type=int, default=-2,
+                        help="the lowest floor (basements are below 0)")
+    common.add_argument("--highest", type=int, default=2,
+                        help="the highest floor")
+    common.add_argument("--cars", type=int, default=2,
+                        help="the number of elevators")
+    common.add_argument("--seed", type=int, default=None,
+                        help="the seed for the requests and destinations")
+    common.add_argument("--steps", type=int, default=20,
+                        help="the number of ticks to make requests for")
+    common.add_argument("--requests", type=int, default=1,
+                        help="the number of requests to make each tick")
+    common.add_argument("--max-ticks", type=int, default=None,
+                        help="the most ticks to run for")
+    common.add_argument("--profile", default=None,
+                        help="move continuously with SPEED,ACCELERATION[,JERK] "
+                             "(metres and seconds)")
+    common.add_argument("--format", choices=("text", "json", "csv"),
+                        default="text", help="the output format")
+
+    run = commands.add_parser("run", parents=[common],
+                              help="simulate a seeded workload")
+    run.add_argument("--record", default=None,
+                     help="save the workload to this file")
+    run.add_argument("--display", action="store_true",
+                     help="print the system every tick")
+    run.add_argument("--telemetry", default=None,
+                     help="write telemetry to this memory-mapped file")
+    run.add_argument("--spill", default=None,
+                     help="append completed requests to this file")
+
+    replay = commands.add_parser("replay", parents=[common],
+                                 help="simulate a recorded workload")
+    replay.add_argument("workload",
+                        help="the recorded workload (replayed with the floors, "
+                             "elevators and seed it was recorded with)")
+    replay.add_argument("--display", action="store_true",
+                        help="print the system every tick")
+
+    benchmark = commands.add_parser("benchmark", parents=[common],
+                                    help="time each tick of a seeded workload")
+    benchmark.add_argument("--repeats", type=int, default=5,
+                           help="the number of times to run the workload")
+    benchmark.add_argument("--vectorized", action="store_true",
+                           help="work out the timing statistics with NumPy")
+
+    sweep = commands.add_parser("sweep", parents=[common],
+                                help="simulate a workload for a range of "
+                                     "elevator numbers")
+    sweep.add_argument("--min-cars", type=int, default=1,
+                       help="the fewest elevators to simulate")
+    sweep.add_argument("--max-cars", type=int, default=8,
+                       help="the most elevators to simulate")
+
+    tournament = commands.add_parser("tournament", parents=[common],
+                                     help="compare dispatch policies on the "
+                                          "same workloads")
+    tournament.add_argument("--policies", default="greedy,nearest,parking",
+                            help="the policies to compare (comma separated)")
+    tournament.add_argument("--rounds", type=int, default=3,
+                            help="the number of seeded workloads to run")
+    tournament.add_argument("--workload", dest="workloads", action="append",
+                            default=None,
+                            help="run a recorded workload instead of seeded "
+                                 "ones (can be given more than once)")
+    tournament.add_argument("--processes", type=int, default=None,
+                            help="the number of worker processes (one for each "
+                                 "CPU if not given)")
+    tournament.add_argument("--tuned", default=None,
+                            help="also compare the parameters saved by tune "
+                                 "for this building")
+
+    tune = commands.add_parser("tune", parents=[common],
+                               help="search for the dispatch parameters with "
+                                    "the lowest p90 wait")
+    tune.add_argument("--candidates", type=int, default=27,
+                      help="the number of parameters to try")
+    tune.add_argument("--reduction", type=int, default=3,
+                      help="one in this many candidates go on to each round")
+    tune.add_argument("--rounds", type=int, default=1,
+                      help="the number of workloads each candidate is first "
+                           "run on")
+    tune.add_argument("--workload", dest="workloads", action="append",
+                      default=None,
+                      help="tune for a recorded workload instead of seeded ones "
+                           "(can be given more than once)")
+    tune.add_argument("--processes", type=int, default=None,
+                      help="the number of worker processes (one for each CPU "
+                           "if not given)")
+    tune.add_argument("--output", default="tuned.json",
+                      help="the file to save the best parameters to")
+
+    options = parser.parse_args(args)
+
+    # Options which would otherwise fail part way through the simulation
+    if options.lowest > options.highest :
+        parser.error("--lowest can't be above --highest")
+    if options.cars < 1 :
+        parser.error("--cars must be at least 1")
+    if options.profile is not None :
+        try :
+            values = [float(value) for value in options.profile.split(',')]
+        except ValueError :
+            values = []
+        if not 2 <= len(values) <= 3 or min(values) <= 0 :
+            parser.error("--profile must be SPEED,ACCELERATION[,JERK] (2 or 3 "
+                         "positive numbers)")
+    if options.command == "benchmark" and options.repeats < 1 :
+        parser.error("--repeats must be at least 1")
+    if options.command == "sweep" :
+        if options.min_cars < 1 :
+            parser.error("--min-cars must be at least 1")
+        if options.min_cars > options.max_cars :
+            parser.error("--min-cars can't be more than --max-cars")
+
+    return options
+
+
+def make_profile(options) :
+    """Returns the motion profile given on the command line (None if not
+    given).
+
+    Parameters:
+        options (Namespace) -> the command line options.
+    """
+    if options.profile is None :
+        return None
+
+    return MotionProfile(*[float(value) for value in options.profile.split(',')])
+
+
+def simulate(options, building, workload, cars, telemetry=None, log=None) :
+    """Simulates a workload and returns a summary of the run.
+
+    Parameters:
+        options (Namespace) -> the command line options.
+        building (Building) -> the building to simulate.
+        workload (List<Tuple>) -> the (tick, height, direction) of each request.
+        cars (int) -> the number of elevators.
+        telemetry (TelemetryWriter) -> written to every tick.
+        log (RequestLog) -> summarises the completed requests.
+    """
+    random.seed(options.seed)
+    system = TransportSystem(building=building, elevatorNumber=cars,
+                             profile=make_profile(options),
+                             display=getattr(options, "display", False),
+                             telemetry=telemetry, log=log)
+
+    start = perf_counter()
+    ticks = run_workload(system, workload, options.max_ticks)
+    seconds = perf_counter() - start
+
+    sketch = system.get_log().get_sketch()
+    summary = {"cars" : cars,
+               "requests" : len(workload),
+               "ticks" : ticks,
+               "completed" : sketch.get_count(),
+               "pending" : system.get_pending(),
+               "passengers" : system.get_log().get_passengers(),
+               "wait_mean" : sketch.get_mean()}
+    for percent in PERCENTILES :
+        summary["wait_p{}".format(percent)] = sketch.percentile(percent)
+    summary["wait_max"] = sketch.get_max()
+    summary["seconds"] = seconds
+
+    return summary
+
+
+def write_rows(rows, format) :
+    """Writes rows of results to standard output.
+
+    Parameters:
+        rows (List<Dict>) -> the results (each with the same keys).
+        format (str) -> "text", "json" or "csv".
+    """
+    if format == "json" :
+        import json
+        json.dump(rows if len(rows) > 1 else rows[0], sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    elif format == "csv" :
+        import csv
+        writer = csv.DictWriter(sys.stdout, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    else :
+        for index, row in enumerate(rows) :
+            if index :
+                sys.stdout.write("\n")
+
+            width = max(len(key) for key in row)
+            for key, value in row.items() :
+                if isinstance(value, float) :
+                    value = round(value, 6)
+                sys.stdout.write("{}: {}\n".format(key.rjust(width), value))
+
+
+def timing_statistics(times, vectorized) :
+    """Returns statistics of the time taken by each tick (in microseconds).
+
+    Parameters:
+        times (List<float>) -> the time taken by each tick (in seconds).
+        vectorized (Bool) -> True to use NumPy, False otherwise.
+    """
+    statistics = {"ticks_timed" : len(times)}
+
+    # Nothing was timed (i.e. an empty workload)
+    if not times :
+        statistics["tick_us_mean"] = None
+        for percent in PERCENTILES :
+            statistics["tick_us_p{}".format(percent)] = None
+        statistics["ticks_per_second"] = None
+        return statistics
+
+    if vectorized :
+        try :
+            import numpy
+        except ImportError :
+            sys.exit("--vectorized needs NumPy to be installed")
+
+        micros = numpy.asarray(times) * 1e6
+        statistics["tick_us_mean"] = float(micros.mean())
+        for percent in PERCENTILES :
+            statistics["tick_us_p{}".format(percent)] = \
+                float(numpy.percentile(micros, percent))
+
+    else :
+        micros = sorted(time * 1e6 for time in times)
+        statistics["tick_us_mean"] = sum(micros) / len(micros)
+        for percent in PERCENTILES :
+            index = min(len(micros) - 1, int(percent / 100 * len(micros)))
+            statistics["tick_us_p{}".format(percent)] = micros[index]
+
+    statistics["ticks_per_second"] = len(times) / sum(times)
+    return statistics
+
+
+def benchmark(options, building, workload) :
+    """Times each tick of a workload over a number of repeats.
+
+    Parameters:
+        options (Namespace) -> the command line options.
+        building (Building) -> the building to simulate.
+        workload (List<Tuple>) -> the (tick, height, direction) of each request.
+    """
+    times = []
+    for _ in range(options.repeats) :
+        random.seed(options.seed)
+        system = TransportSystem(building=building, elevatorNumber=options.cars,
+                                 profile=make_profile(options), display=False)
+
+        run_workload(system, workload, options.max_ticks, times)
+
+    row = {"cars" : options.cars, "requests" : len(workload),
+           "repeats" : options.repeats}
+    row.update(timing_statistics(times, options.vectorized))
+    return row
+
+
+def load_recorded(path, building) :
+    """Returns a recorded workload, exiting if it has requests on floors the
+    building doesn't have.
+
+    Parameters:
+        path (str) -> the recorded workload.
+        building (Building) -> the building the workload will be run in.
+    """
+    workload = load_workload(path)
+
+    missing = check_workload(building, workload)
+    if missing :
+        sys.exit("{} has requests on floors {} which aren't in the building "
+                 "({} to {}), use --lowest and --highest".format(
+                     path, ", ".join(str(height) for height in missing),
+                     building.get_lowest(), building.get_highest()))
+
+    return workload
+
+
+def main(args=None) :
+    """Runs the command given on the command line.
+
+    Parameters:
+        args (List<str>) -> the command line (if not given, sys.argv).
+    """
+    options = parse_args(args)
+
+    # A recorded workload is replayed in the building it was recorded in
+    if options.command == "replay" :
+        for name, value in load_settings(options.workload).items() :
+            setattr(options, name, value)
+
+    building = Building(lowest=options.lowest, highest=options.highest)
+
+    if options.command == "replay" :
+        workload = load_recorded(options.workload, building)
+    elif options.command in ("tournament", "tune") :
+        if options.workloads :
+            workloads = [load_recorded(path, building)
+                         for path in options.workloads]
+        else :
+            workloads = [generate_workload(building, options.steps,
+                                           options.requests,
+                                           None if options.seed is None else
+                                           options.seed + index)
+                         for index in range(options.rounds)]
+    else :
+        workload = generate_workload(building, options.steps, options.requests,
+                                     options.seed)
+
+    if options.command == "run" :
+        if options.record is not None :
+            settings = {"lowest" : options.lowest,
+                        "highest" : options.highest,
+                        "cars" : options.cars}
+            if options.seed is not None :
+                settings["seed"] = options.seed
+            save_workload(options.record, workload, settings)
+
+        telemetry = None
+        if options.telemetry is not None :
+            from telemetry import TelemetryWriter
+            telemetry = TelemetryWriter(options.telemetry, options.cars)
+
+        log = None
+        if options.spill is not None :
+            from records import RequestLog
+            log = RequestLog(options.spill)
+
+        rows = [simulate(options, building, workload, options.cars, telemetry,
+                         log)]
+
+        if telemetry is not None :
+            telemetry.close()
+        if log is not None :
+            log.close()
+
+    elif options.command == "replay" :
+        rows = [simulate(options, building, workload, options.cars)]
+
+    elif options.command == "benchmark" :
+        rows = [benchmark(options, building, workload)]
+
+    elif options.command == "sweep" :
+        rows = [simulate(options, building, workload, cars)
+                for cars in range(options.min_cars, options.max_cars + 1)]
+
+    elif options.command == "tournament" :
+        from tournament import POLICIES, run_tournament
+
+        policies = {}
+        for name in options.policies.split(',') :
+            if name not in POLICIES :
+                sys.exit("unknown policy {} (choose from {})".format(
+                    name, ", ".join(POLICIES)))
+            policies[name] = POLICIES[name]()
+
+        if options.tuned is not None :
+            from tuner import load_policy, profile_key
+
+            key = profile_key(options.lowest, options.highest, options.cars,
+                              make_profile(options))
+            policies["tuned"] = load_policy(options.tuned, key)
+            if policies["tuned"] is None :
+                sys.exit("{} has no parameters for {}".format(options.tuned,
+                                                              key))
+
+        try :
+            rows = run_tournament(policies, workloads, options.lowest,
+                                  options.highest, options.cars, options.seed,
+                                  make_profile(options), options.max_ticks,
+                                  options.processes)
+        except ValueError as error :
+            sys.exit(str(error))
+
+    elif options.command == "tune" :
+        from tuner import save_tuning, tune
+
+        start = perf_counter()
+        result = tune(workloads, options.lowest, options.highest, options.cars,
+                      options.candidates, options.reduction, options.rounds,
+                      options.seed, make_profile(options), options.max_ticks,
+                      options.processes)
+        save_tuning(options.output, result)
+
+        row = {"key" : result["key"]}
+        row.update(result["parameters"])
+        for name in ("wait_p90", "wait_mean", "pending", "default_wait_p90",
+                     "default_wait_mean", "default_pending", "candidates",
+                     "simulations") :
+            row[name] = result[name]
+        row["seconds"] = perf_counter() - start
+        rows = [row]
+
+    write_rows(rows, options.format)
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,168 @@
+## Dispatch policies -> decide which elevator completes each request, and where
+## idle elevators wait. The transport system is given a policy when it's made
+## (GreedyPolicy if not), so policies can be swapped without changing it.
+##
+## A policy has three decisions:
+##
+## - assign    the elevator to complete a request (None to try again next tick).
+## - reassign  assigns a batch of requests (every unassigned request each tick,
+##             and the requests taken from an elevator out of service).
+## - park      the floor an idle elevator should wait on (None to stay put).
+
+import math
+
+
+class DispatchPolicy :
+    """Decides which elevators complete which requests (extend this to try a
+    different way of dispatching)."""
+
+    def assign(self, system, request) :
+        """Returns the elevator which should complete a request (None if no
+        elevator should be assigned yet).
+
+        Parameters:
+            system (TransportSystem) -> the system the request was made in.
+            request (Request) -> the request to find an elevator for.
+        """
+        raise NotImplementedError
+
+    def reassign(self, system, requests) :
+        """Assigns a batch of unassigned requests (by default, one at a time in
+        the order given).
+
+        Parameters:
+            system (TransportSystem) -> the system the requests were made in.
+            requests (List<Request>) -> the requests to assign.
+        """
+        for request in requests :
+            elevator = self.assign(system, request)
+            if elevator is not None :
+                system.assign_request(request, elevator, 'P')
+
+    def park(self, system, elevator) :
+        """Returns the floor an idle elevator should move to and wait on (None
+        to wait where it is).
+
+        Parameters:
+            system (TransportSystem) -> the system the elevator is in.
+            elevator (Elevator) -> the idle elevator.
+        """
+        return None
+
+
+class GreedyPolicy(DispatchPolicy) :
+    """Assigns each request to the elevator estimated to complete it the
+    soonest (the original heuristic)."""
+
+    def __init__(self, openingTime=None, stopPenalty=None, pickUpWeight=1,
+                 dropOffWeight=1) :
+        """Creates the policy, with the parameters the elevators' estimates are
+        made with (the defaults give the original heuristic).
+
+        Parameters:
+            openingTime (float) -> the time the doors are estimated to be open
+                                   for (if not given, each elevator's own).
+            stopPenalty (float) -> the number of opening times each stop on the
+                                   way is estimated to take (if not given,
+                                   STOP_PENALTY).
+            pickUpWeight (float) -> weights the stops where passengers are
+                                    picked up.
+            dropOffWeight (float) -> weights the stops where passengers are only
+                                     dropped off.
+        """
+        self.weights = (openingTime, stopPenalty, pickUpWeight, dropOffWeight)
+
+    def get_parameters(self) :
+        """Returns the parameters of the policy, by name.
+        """
+        return dict(zip(("openingTime", "stopPenalty", "pickUpWeight",
+                         "dropOffWeight"), self.weights))
+
+    def assign(self, system, request) :
+        """Returns the operational elevator estimated to complete a request the
+        soonest (None if no elevator can complete it without turning around).
+
+        Parameters:
+            system (TransportSystem) -> the system the request was made in.
+            request (Request) -> the request to find an elevator for.
+        """
+        optElevator = None
+        minTicks = math.inf
+
+        for elevator in system.get_elevators() :
+            if not elevator.is_operational() :
+                continue
+
+            elevatorTicks = elevator.determine_ticks(request, self.weights)
+
+            # Found a new optimal elevator
+            if elevatorTicks is not None and elevatorTicks < minTicks :
+                optElevator = elevator
+                minTicks = elevatorTicks
+
+        return optElevator
+
+
+class NearestCarPolicy(DispatchPolicy) :
+    """Assigns each request to the closest elevator which can reach it,
+    whatever it's doing (cheap, but ignores the stops on the way)."""
+
+    def assign(self, system, request) :
+        """Returns the closest operational elevator which can reach the floor
+        requested (the one with the fewest stops if more than one is as close).
+
+        Parameters:
+            system (TransportSystem) -> the system the request was made in.
+            request (Request) -> the request to find an elevator for.
+        """
+        floor = request.get_floor()
+        optElevator = None
+        minCost = None
+
+        for elevator in system.get_elevators() :
+            if not elevator.is_operational() or \
+               floor.get_height() not in elevator.get_floor_plan() :
+                continue
+
+            cost = (abs(elevator.get_last_floor() - floor),
+                    elevator.get_stop_count())
+            if minCost is None or cost < minCost :
+                optElevator = elevator
+                minCost = cost
+
+        return optElevator
+
+
+class ParkingPolicy(GreedyPolicy) :
+    """Assigns requests like GreedyPolicy, and sends idle elevators back to a
+    home floor (i.e. the lobby)."""
+
+    def __init__(self, home=None, **parameters) :
+        """Creates the policy.
+
+        Parameters:
+            home (int) -> the height of the floor idle elevators wait on (the
+                          lowest floor each elevator can reach if not given).
+            parameters (Dict) -> the parameters for GreedyPolicy.
+        """
+        GreedyPolicy.__init__(self, **parameters)
+        self.home = home
+
+    def park(self, system, elevator) :
+        """Returns the home floor, if the elevator can reach it and isn't there
+        already.
+
+        Parameters:
+            system (TransportSystem) -> the system the elevator is in.
+            elevator (Elevator) -> the idle elevator.
+        """
+        if self.home is None :
+            home = elevator.get_bottom_floor()
+        else :
+            home = self.home
+
+        if home not in elevator.get_floor_plan() or \
+           elevator.get_last_floor().get_height() == home :
+            return None
+
+        return system.floorDetails[home]
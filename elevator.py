@@ -15,9 +15,15 @@
 ##   elevator though and use this for capacity).
 ## - look into how real elevator systems work with a lot of falls
 
+import bisect
 import math
 import random
-from time import *
+from array import array
+from collections import OrderedDict
+from time import perf_counter, process_time, sleep
+
+from dispatch import GreedyPolicy
+from records import RequestLog
 
 
 # Constants
@@ -26,6 +32,20 @@ from time import *
 DEFAULT_SPEED = 1 # floors/tick
 DEFAULT_TIME = 1 # seconds/tick
 LAST_FLOOR = 0 # default starting floor
+ETA_CACHE_SIZE = 1024 # the most estimates each elevator remembers
+STATES = ('P', 'D') # picking up and dropping off
+
+# Estimates -> each stop on the way to a request is estimated to take the
+# opening time multiplied by the stop penalty (opening and shutting the doors),
+# weighted by whether passengers are picked up or dropped off there
+STOP_PENALTY = 2
+ESTIMATE_WEIGHTS = (None, None, 1, 1) # opening time (the elevator's if None),
+                                      # stop penalty (STOP_PENALTY if None),
+                                      # pick up weight, drop off weight
+
+# Motion
+TICK_TIME = 1 # seconds simulated each tick
+STOREY_HEIGHT = 3.5 # metres between a floor and the floor above
 
 # Transportation system
 ELEVATOR_NUMBER = 2 # the default number of elevators
@@ -53,6 +73,7 @@ class Passenger :
         """
         self.direction = direction
         self.startFloor = startFloor
+        self.destination = None
 
     def get_direction(self) :
         """Returns the direction the passenger desires to go in.
@@ -64,6 +85,12 @@ class Passenger :
         """
         return self.startFloor
 
+    def get_destination(self) :
+        """Returns the floor the passenger nominated to get off at (None if they
+        haven't boarded yet).
+        """
+        return self.destination
+
     def nominate_floor(self, elevator, floor) :
         """Allows the passenger to nominate which floor they would like to get
         off at.
@@ -72,8 +99,8 @@ class Passenger :
             elevator (Elevator) -> the elevator the passenger is on.
             floor (int) -> the floor number to get off at.
         """
-        if floor not in elevator.get_floors() :
-            elevator.add_floor(floor, 'D')
+        self.destination = floor
+        elevator.add_floor(floor, 'D')
 
 
 class Floor :
@@ -151,12 +178,423 @@ class Floor :
         return self.get_height() - other.get_height()
 
 
+class Building :
+    """Represents the floors of a building and the shafts which serve them."""
+
+    def __init__(self, levels=None, lowest=None, highest=None, skipFloors=None,
+                 serviceMaps=None, storeyHeights=None) :
+        """Creates a building.
+
+        Either the levels are given, or a level is generated for every height
+        between lowest and highest (heights below 0 are basements and height 0 is
+        the ground floor).
+
+        Parameters:
+            levels (Dict<int:str>) -> the mapping from heights to floor names.
+                                      If neither levels nor a range is given,
+                                      defaults to LEVELS.
+            lowest (int) -> the lowest height to generate a floor for.
+            highest (int) -> the highest height to generate a floor for.
+            skipFloors (Set<int>) -> heights which don't exist in the building
+                                     (i.e. there is no 13th floor).
+            serviceMaps (Dict<int:Iterable<int>>) -> the heights each shaft
+                                     (numbered by the index of the car in it)
+                                     can reach. Shafts which aren't given can
+                                     reach every floor.
+            storeyHeights (Dict<int:float>) -> the metres between a floor and the
+                                     floor above it. Floors which aren't given
+                                     default to STOREY_HEIGHT.
+        """
+
+        # Generate the levels from the range of heights
+        if levels is None :
+            if lowest is None or highest is None :
+                levels = LEVELS
+            else :
+                levels = {}
+                for height in range(lowest, highest + 1) :
+                    if height < 0 :
+                        levels[height] = "B{}".format(-height)
+                    elif height == 0 :
+                        levels[height] = "G"
+                    else :
+                        levels[height] = str(height)
+
+        if skipFloors is None :
+            skipFloors = set()
+
+        # Levels are kept from the top floor down (the order they're printed in)
+        self.levels = {}
+        for height in sorted(levels, reverse=True) :
+            if height not in skipFloors :
+                self.levels[height] = levels[height]
+
+        # Precompute the bounds and sorted heights once, so nothing needs to
+        # scan the levels while simulating
+        self.heights = sorted(self.levels)
+        self.heightIndex = {}
+        for index, height in enumerate(self.heights) :
+            self.heightIndex[height] = index
+
+        self.lowest = self.heights[0]
+        self.highest = self.heights[-1]
+
+        # Elevation of each floor (in metres) above the lowest floor
+        if storeyHeights is None :
+            storeyHeights = {}
+
+        self.elevations = {}
+        elevation = 0.0
+        for height in self.heights :
+            self.elevations[height] = elevation
+            elevation += storeyHeights.get(height, STOREY_HEIGHT)
+
+        # Travel tables are made once for each motion profile used
+        self.travelTables = {}
+
+        # The floors which can be reached from each floor in each direction
+        self.floorsAbove = {}
+        self.floorsBelow = {}
+        heights = tuple(self.heights)
+        for index, height in enumerate(heights) :
+            self.floorsAbove[height] = heights[index + 1:]
+            self.floorsBelow[height] = heights[:index]
+
+        # Each shaft is a smaller building made of the floors it can reach
+        self.shafts = {}
+        if serviceMaps is not None :
+            for shaft, heights in serviceMaps.items() :
+                self.shafts[shaft] = Building({height : self.levels[height]
+                                               for height in heights
+                                               if height in self.levels})
+
+    def get_levels(self) :
+        """Returns the mapping from heights to floor names (top floor first).
+        """
+        return self.levels
+
+    def get_heights(self) :
+        """Returns the heights of every floor (lowest first).
+        """
+        return self.heights
+
+    def get_lowest(self) :
+        """Returns the height of the lowest floor.
+        """
+        return self.lowest
+
+    def get_highest(self) :
+        """Returns the height of the highest floor.
+        """
+        return self.highest
+
+    def get_elevation(self, height) :
+        """Returns the elevation of a floor (in metres) above the lowest floor.
+
+        Parameters:
+            height (int) -> the height of the floor.
+        """
+        return self.elevations[height]
+
+    def get_travel_table(self, profile) :
+        """Returns the floor to floor travel times in this building for a
+        motion profile.
+
+        Parameters:
+            profile (MotionProfile) -> the motion profile of the elevator.
+        """
+        if profile not in self.travelTables :
+            self.travelTables[profile] = TravelTable(self, profile)
+
+        return self.travelTables[profile]
+
+    def get_floor_plan(self, shaft=None) :
+        """Returns the levels a shaft can reach.
+
+        Parameters:
+            shaft (int) -> the number of the shaft (every level if not given, or
+                           if the shaft can reach every floor).
+        """
+        if shaft in self.shafts :
+            return self.shafts[shaft].levels
+        else :
+            return self.levels
+
+    def get_reachable(self, height, direction, shaft=None) :
+        """Returns the heights which can be travelled to from the given height
+        in the given direction (lowest first).
+
+        Parameters:
+            height (int) -> the height we are travelling from.
+            direction (char) -> the direction we are travelling in.
+            shaft (int) -> the number of the shaft we are travelling in.
+        """
+        building = self.shafts.get(shaft, self)
+
+        if direction == 'U' :
+            return building.floorsAbove.get(height, ())
+        else :
+            return building.floorsBelow.get(height, ())
+
+
+class MotionProfile :
+    """Kinematic limits of an elevator car (trapezoidal velocity profile)."""
+
+    def __init__(self, maxSpeed, acceleration, jerk=None) :
+        """Creates a motion profile.
+
+        Parameters:
+            maxSpeed (float) -> the rated speed of the car (metres/second).
+            acceleration (float) -> the acceleration of the car (metres/second^2).
+            jerk (float) -> the rate the acceleration changes (metres/second^3).
+                            If not given, the acceleration changes instantly.
+        """
+        self.maxSpeed = maxSpeed
+        self.acceleration = acceleration
+        self.jerk = jerk
+
+    def get_max_speed(self) :
+        """Returns the rated speed of the car.
+        """
+        return self.maxSpeed
+
+    def get_acceleration(self) :
+        """Returns the acceleration of the car.
+        """
+        return self.acceleration
+
+    def get_jerk(self) :
+        """Returns the jerk of the car (None if it isn't limited).
+        """
+        return self.jerk
+
+    def travel_time(self, distance) :
+        """Returns the time (in seconds) to travel a distance, starting and
+        stopping at rest.
+
+        Parameters:
+            distance (float) -> the distance to travel (metres).
+        """
+        distance = abs(distance)
+        speed = self.maxSpeed
+        acceleration = self.acceleration
+        jerk = self.jerk
+
+        # Trapezoid -> accelerate, cruise at the rated speed and decelerate, or
+        # a triangle if the trip is too short to reach the rated speed
+        if jerk is None :
+            if distance >= speed * speed / acceleration :
+                return distance / speed + speed / acceleration
+            else :
+                return 2 * math.sqrt(distance / acceleration)
+
+        # S-curve -> the acceleration ramps up and down at the given jerk, so
+        # the peak speed (and acceleration) depends on the distance
+        if speed >= acceleration * acceleration / jerk :
+            if distance >= speed * (speed / acceleration + acceleration / jerk) :
+                return distance / speed + speed / acceleration + acceleration / jerk
+        elif distance >= 2 * speed * math.sqrt(speed / jerk) :
+            return distance / speed + 2 * math.sqrt(speed / jerk)
+
+        # Rated speed isn't reached, find the peak speed
+        peak = acceleration / 2 * (math.sqrt((acceleration / jerk) ** 2 +
+                                             4 * distance / acceleration) -
+                                   acceleration / jerk)
+        if peak >= acceleration * acceleration / jerk :
+            return 2 * (peak / acceleration + acceleration / jerk)
+        else :
+            return 4 * (distance / (2 * jerk)) ** (1 / 3)
+
+    def plan_trip(self, distance, speed=0.0) :
+        """Returns the plan of a trip which stops after a distance, or None if
+        the car is going too fast to stop in time.
+
+        A plan is (starting speed, peak speed, seconds accelerating, seconds
+        until decelerating, seconds for the trip, distance, scale), with the
+        trip treated as a trapezoid. An S-curve trip from rest is stretched by
+        the scale to take the same time as the S-curve (close enough for
+        handshaking floors).
+
+        Parameters:
+            distance (float) -> the distance to travel (metres).
+            speed (float) -> the speed the car is already going in the direction
+                             of the trip (metres/second).
+        """
+        distance = abs(distance)
+        acceleration = self.acceleration
+
+        # Stopping distance
+        if speed * speed / (2 * acceleration) > distance + 1e-9 :
+            return None
+
+        # Accelerate from the starting speed to the peak, cruise, then
+        # decelerate to rest
+        peak = max(speed, min(self.maxSpeed,
+                              math.sqrt(acceleration * distance +
+                                        speed * speed / 2)))
+        accelerating = (peak - speed) / acceleration
+        cruising = distance - (2 * peak * peak - speed * speed) / \
+                   (2 * acceleration)
+        if peak > 0 :
+            decelerating = accelerating + max(0.0, cruising) / peak
+        else :
+            decelerating = accelerating
+        end = decelerating + peak / acceleration
+
+        scale = 1.0
+        if speed == 0 and self.jerk is not None and end > 0 :
+            scale = end / self.travel_time(distance)
+
+        return (speed, peak, accelerating, decelerating, end, distance, scale)
+
+    def plan_duration(self, plan) :
+        """Returns the time (in seconds) a planned trip takes.
+
+        Parameters:
+            plan (Tuple) -> the plan from plan_trip.
+        """
+        return plan[4] / plan[6]
+
+    def plan_distance(self, plan, time) :
+        """Returns the distance travelled after some time into a planned trip.
+
+        Parameters:
+            plan (Tuple) -> the plan from plan_trip.
+            time (float) -> the time since the trip started (seconds).
+        """
+        speed, peak, accelerating, decelerating, end, distance, scale = plan
+        acceleration = self.acceleration
+        time *= scale
+
+        if time >= end :
+            return distance
+        elif time <= accelerating :
+            return speed * time + acceleration * time * time / 2
+        elif time <= decelerating :
+            return (speed + peak) / 2 * accelerating + \
+                   peak * (time - accelerating)
+        else :
+            remaining = end - time
+            return distance - acceleration * remaining * remaining / 2
+
+    def plan_speed(self, plan, time) :
+        """Returns the speed (metres/second) after some time into a planned
+        trip.
+
+        Parameters:
+            plan (Tuple) -> the plan from plan_trip.
+            time (float) -> the time since the trip started (seconds).
+        """
+        speed, peak, accelerating, decelerating, end, distance, scale = plan
+        time *= scale
+
+        if time >= end :
+            return 0.0
+        elif time <= accelerating :
+            return (speed + self.acceleration * time) * scale
+        elif time <= decelerating :
+            return peak * scale
+        else :
+            return self.acceleration * (end - time) * scale
+
+    def travel_distance(self, time, distance) :
+        """Returns the distance travelled after some time into a trip from rest
+        to rest.
+
+        Parameters:
+            time (float) -> the time since the trip started (seconds).
+            distance (float) -> the distance of the whole trip (metres).
+        """
+        return self.plan_distance(self.plan_trip(distance), time)
+
+    def __hash__(self) :
+        return hash((self.maxSpeed, self.acceleration, self.jerk))
+
+    def __eq__(self, other) :
+        return (self.maxSpeed, self.acceleration, self.jerk) == \
+               (other.maxSpeed, other.acceleration, other.jerk)
+
+
+class TravelTable :
+    """Precomputed floor to floor travel times in a building for a motion
+    profile."""
+
+    def __init__(self, building, profile) :
+        """Creates a travel table.
+
+        Parameters:
+            building (Building) -> the building the elevator travels in.
+            profile (MotionProfile) -> the motion profile of the elevator.
+        """
+        self.profile = profile
+        self.heights = building.get_heights()
+        self.heightIndex = building.heightIndex
+        self.elevations = [building.get_elevation(height)
+                           for height in self.heights]
+
+        # Flat table of times, indexed by (start index * size + end index).
+        # Trips over the same distance take the same time, so each distance is
+        # only worked out once.
+        self.size = len(self.heights)
+        self.times = array('d', [0.0]) * (self.size * self.size)
+        distanceTimes = {}
+
+        for start in range(self.size) :
+            for end in range(start + 1, self.size) :
+                distance = round(self.elevations[end] - self.elevations[start], 6)
+
+                if distance not in distanceTimes :
+                    distanceTimes[distance] = profile.travel_time(distance)
+
+                time = distanceTimes[distance]
+                self.times[start * self.size + end] = time
+                self.times[end * self.size + start] = time
+
+    def get_profile(self) :
+        """Returns the motion profile the table was made for.
+        """
+        return self.profile
+
+    def get_time(self, start, end) :
+        """Returns the time (in seconds) to travel between two floors.
+
+        Parameters:
+            start (int) -> the height we are travelling from.
+            end (int) -> the height we are travelling to.
+        """
+        return self.times[self.heightIndex[start] * self.size +
+                          self.heightIndex[end]]
+
+    def get_elevation(self, height) :
+        """Returns the elevation of a floor (in metres).
+
+        Parameters:
+            height (int) -> the height of the floor.
+        """
+        return self.elevations[self.heightIndex[height]]
+
+    def get_floor_passed(self, elevation, direction) :
+        """Returns the height of the last floor passed at an elevation.
+
+        Parameters:
+            elevation (float) -> the elevation of the car (metres).
+            direction (char) -> the direction the car is travelling in.
+        """
+        if direction == 'U' :
+            index = bisect.bisect_right(self.elevations, elevation + 1e-9) - 1
+        else :
+            index = bisect.bisect_left(self.elevations, elevation - 1e-9)
+
+        return self.heights[index]
+
+
 class Elevator :
     """Elevator which moves passengers."""
 
     def __init__(self, floorDetails, lastFloor, name=None, floorPlan=None, speed=None,
                  openingTime=None, direction=None, state=None,
-                 floorActions=None, operational=True, opened=False) :
+                 floorActions=None, operational=True, opened=False,
+                 profile=None, shaft=None) :
         """Creates an elevator.
         (need to add dict mapping floor numbers to list of chars associated with the
         actions this elevator is completing at each floor).
@@ -177,11 +615,18 @@ class Elevator :
                            "Picking up", "Dropping off", "Both" or None (not used).
                            Could have "Moving up to pick up passenger from level 2"
                            or something more descriptive?
-            floorActions (List<Floor>) -> the floor details if we have an action to
-                                          complete.
+            floorActions (List<Floor>) -> the floors we have an action to complete
+                                          on (using the floor's actions, or
+                                          dropping off if it has none).
             operational (Bool) -> True if the elevator is operational, False
                                   otherwise (not in use).
             opened (Bool) -> True if the elevators doors are open, False otherwise
+            profile (MotionProfile) -> the motion profile of the elevator. If given,
+                                       the elevator travels continuously between
+                                       floors (speed isn't used).
+            shaft (int) -> the number of the shaft the elevator is in, for the
+                           building's service maps (None if it can reach every
+                           floor).
         """
         
         # Keep track of specific properties of the last floor this elevator
@@ -197,11 +642,20 @@ class Elevator :
         else :
             self.name = name
 
+        self.shaft = shaft
+
+        # Precompute the heights the elevator passes through, so moving doesn't
+        # need to scan the floors
+        self.heights = sorted(self.floorDetails)
+        self.heightIndex = {}
+        for index, height in enumerate(self.heights) :
+            self.heightIndex[height] = index
+
         # Nominate a floor plan the elevator can use
         if floorPlan is None :
-            self.floorPlan = LEVELS
+            self.set_floor_plan(LEVELS)
         else :
-            self.floorPlan = floorPlan
+            self.set_floor_plan(floorPlan)
 
         # Determine the speed of the elevator
         if speed is None :
@@ -218,26 +672,49 @@ class Elevator :
         self.direction = direction
         self.state = state
 
-        # Alternative data structure for elevator path
-        #if floors is None :
-            # Use a list, heap or tree?
-            # Start with a list ->
-            #     insert : O(n)
-            #     read : O(1)
-            #     remove : O(n) -> heap is better
-        #    self.floors = {}
-        #else :
-        #    self.floors = floors
-
-        # Used a list implementation - actions at each floor
-        if floorActions is None :
-            self.floorActions = []
-        else :
-            self.floorActions = floorActions
+        # The stops of this elevator's path, as bitsets with a bit for each
+        # height (by index) for each state. Floors are shared by every
+        # elevator, so the stops aren't kept on them.
+        #     insert : O(1)
+        #     read : O(1)
+        #     remove : O(1)
+        #     next stop : O(1)
+        self.stops = {state : 0 for state in STATES}
+
+        # Every stop, whatever the reason
+        self.stopMask = 0
 
         # States for elevator
         self.operational = operational
         self.opened = opened
+
+        # Continuous motion -> the travel table is given by the transport system,
+        # and a trip is [start elevation, end height, seconds travelled,
+        # elevation, plan, 1 going up or -1 going down] (the elevation is worked
+        # out once each tick, when the car moves)
+        self.profile = profile
+        self.travelTable = None
+        self.trip = None
+
+        # The floor the elevator is moving to wait on while idle (kept apart
+        # from the stops, so parking is called off as soon as the elevator is
+        # given a request, and the doors don't open there)
+        self.parkFloor = None
+
+        # Requests assigned to this elevator, by (height, direction) -> so
+        # opening at a floor only looks at the requests waiting there
+        self.assignedRequests = {}
+
+        # The path version changes whenever anything determine_ticks depends on
+        # changes, so estimates are only worked out again when they could differ.
+        # The cache maps (height, direction) to (version, ticks), least recently
+        # used first.
+        self.version = 0
+        self.etaCache = OrderedDict()
+
+        if floorActions is not None :
+            for floor in floorActions :
+                self.add_floor(floor, floor.get_actions() or 'D')
         
     def get_last_floor(self) :
         """Returns the last floor the elevator handshaked."""
@@ -249,21 +726,128 @@ class Elevator :
         Parameters:
             lastFloor (int) -> the last floor the elevator handshaked.
         """
-        self.lastFloor = self.floorDetails[lastFloor]
+        if self.lastFloor.get_height() != lastFloor :
+            self.lastFloor = self.floorDetails[lastFloor]
+            self.version += 1
+
+    def get_floor_plan(self) :
+        """Returns the names for each elevation the elevator can reach."""
+        return self.floorPlan
+
+    def set_floor_plan(self, floorPlan) :
+        """Sets the elevations the elevator can reach.
+
+        Parameters:
+            floorPlan (Dict<int:str>) -> the names for each elevation the elevator
+                                         can reach.
+        """
+        self.floorPlan = floorPlan
+
+        # Bounds of the shaft
+        self.topFloor = max(floorPlan)
+        self.bottomFloor = min(floorPlan)
+
+    def get_bottom_floor(self) :
+        """Returns the height of the lowest floor the elevator can reach."""
+        return self.bottomFloor
+
+    def get_top_floor(self) :
+        """Returns the height of the highest floor the elevator can reach."""
+        return self.topFloor
 
     def get_next_floor(self) :
-        """Reads the next floor the elevator will travel to."""
-        if self.get_floors() :
-            floor = self.get_floors()[0]
+        """Reads the next floor the elevator will travel to.
+
+        The elevator keeps going in its direction while it has stops that way,
+        and otherwise goes to the closest stop (or the floor it's parking on, if
+        it has no stops).
+        """
+        mask = self.stopMask
+        if not mask :
+            return self.parkFloor
+
+        index = self.heightIndex[self.get_last_floor().get_height()]
+
+        # Closest stops above and below (not counting this floor) -> get_floors
+        # orders the stops the same way
+        above = None
+        aboveMask = mask >> (index + 1)
+        if aboveMask :
+            above = index + (aboveMask & -aboveMask).bit_length()
+
+        below = None
+        belowMask = mask & ((1 << index) - 1)
+        if belowMask :
+            below = belowMask.bit_length() - 1
+
+        # Only stopping on this floor
+        if above is None and below is None :
+            return self.get_last_floor()
+
+        if below is None or (self.direction == 'U' and above is not None) :
+            nextIndex = above
+        elif above is None or self.direction == 'D' :
+            nextIndex = below
+        elif above - index <= index - below :
+            nextIndex = above
         else :
-            floor = None
+            nextIndex = below
 
-        return floor
+        return self.floorDetails[self.heights[nextIndex]]
     
+    def add_request(self, request) :
+        """Adds a request this elevator has been assigned.
+
+        Parameters:
+            request (Request) -> the request assigned to this elevator.
+        """
+        key = (request.get_floor().get_height(), request.get_direction())
+        self.assignedRequests.setdefault(key, []).append(request)
+
+    def pop_requests(self, floor) :
+        """Removes and returns the requests assigned to this elevator on a
+        floor (in either direction).
+
+        Parameters:
+            floor (Floor) -> the floor the elevator has opened on.
+        """
+        height = floor.get_height()
+        return self.assignedRequests.pop((height, 'U'), []) + \
+               self.assignedRequests.pop((height, 'D'), [])
+
+    def pop_all_requests(self) :
+        """Removes and returns every request assigned to this elevator.
+        """
+        requests = []
+        for floorRequests in self.assignedRequests.values() :
+            requests.extend(floorRequests)
+
+        self.assignedRequests = {}
+        return requests
+
+    def is_operational(self) :
+        """Returns True if the elevator is operational, False otherwise.
+        """
+        return self.operational
+
+    def set_operational(self, operational) :
+        """Sets whether the elevator is operational (can be dispatched to).
+
+        Parameters:
+            operational (Bool) -> True if the elevator is operational, False
+                                  otherwise.
+        """
+        self.operational = operational
+
     def get_name(self) :
         """Returns the name of the elevator."""
         return self.name
 
+    def get_shaft(self) :
+        """Returns the number of the shaft the elevator is in (None if it can
+        reach every floor)."""
+        return self.shaft
+
     def get_speed(self) :
         """Returns the speed of the elevator."""
         return self.speed
@@ -275,6 +859,54 @@ class Elevator :
             speed (int) -> the new speed of the elevator.
         """
         self.speed = speed
+        self.version += 1
+
+    def get_profile(self) :
+        """Returns the motion profile of the elevator (None if it moves a
+        number of floors each tick).
+        """
+        return self.profile
+
+    def set_travel_table(self, travelTable) :
+        """Sets the floor to floor travel times for the elevator's motion
+        profile.
+
+        Parameters:
+            travelTable (TravelTable) -> the travel times for the building.
+        """
+        self.travelTable = travelTable
+        self.version += 1
+
+    def get_position(self) :
+        """Returns the elevation of the elevator (in metres), or None if the
+        elevator doesn't have a travel table.
+        """
+        if self.travelTable is None :
+            return None
+
+        if self.trip is None :
+            return self.travelTable.get_elevation(
+                self.get_last_floor().get_height())
+
+        # Part way through a trip
+        return self.trip[3]
+
+    def is_travelling(self) :
+        """Returns True if the elevator is part way through a trip between
+        floors, False otherwise.
+        """
+        return self.trip is not None
+
+    def travel_ticks(self, start, end) :
+        """Returns the number of ticks to travel between two floors (using the
+        travel table).
+
+        Parameters:
+            start (Floor) -> the floor we are travelling from.
+            end (Floor) -> the floor we are travelling to.
+        """
+        return math.ceil(self.travelTable.get_time(start.get_height(),
+                                                   end.get_height()) / TICK_TIME)
 
     def get_opening_time(self) :
         """Returns the opening time of the elevator doors.
@@ -287,7 +919,9 @@ class Elevator :
         Parameters:
             direction (char) -> the desired direction for the elevator. 
         """
-        self.direction = direction
+        if self.direction != direction :
+            self.direction = direction
+            self.version += 1
 
     def get_direction(self) :
         """Returns the direction the elevator is going in."""
@@ -302,6 +936,21 @@ class Elevator :
         """
         self.opened = opened
 
+    def get_park_floor(self) :
+        """Returns the floor the elevator is moving to wait on (None if it
+        isn't parking).
+        """
+        return self.parkFloor
+
+    def set_park_floor(self, floor) :
+        """Sets the floor the elevator moves to and waits on while it has no
+        stops (None to stop parking).
+
+        Parameters:
+            floor (Floor) -> the floor to wait on.
+        """
+        self.parkFloor = floor
+
     def get_opened(self) :
         """Returns the opened state of the elevator.
         """
@@ -310,20 +959,201 @@ class Elevator :
     def get_floors(self) :
         """Returns the floors the elevator needs to travel to (in order).
         """
-        return self.floorActions
+        mask = self.stopMask
+        index = self.heightIndex[self.get_last_floor().get_height()]
+        floors = []
+
+        # This floor first
+        if mask >> index & 1 :
+            floors.append(self.get_last_floor())
+
+        # Then the stops ahead (closest first), then the stops behind. Like
+        # get_next_floor, an idle elevator heads for the closest stop first.
+        aboveMask = mask >> (index + 1) << (index + 1)
+        belowMask = mask & ((1 << index) - 1)
+        above = self.mask_floors(aboveMask)
+        below = self.mask_floors(belowMask)
+        below.reverse()
+
+        if not belowMask or (self.direction == 'U' and aboveMask) :
+            goingUp = True
+        elif not aboveMask or self.direction == 'D' :
+            goingUp = False
+        else :
+            goingUp = (aboveMask & -aboveMask).bit_length() - 1 - index <= \
+                      index - (belowMask.bit_length() - 1)
+
+        if goingUp :
+            return floors + above + below
+        else :
+            return floors + below + above
+
+    def mask_floors(self, mask) :
+        """Returns the floors in a bitset (lowest first).
+
+        Parameters:
+            mask (int) -> the bitset of height indices.
+        """
+        floors = []
+        while mask :
+            lowest = mask & -mask
+            floors.append(self.floorDetails[self.heights[lowest.bit_length() - 1]])
+            mask ^= lowest
+
+        return floors
+
+    def has_floor(self, floor) :
+        """Returns True if the elevator needs to stop on a floor, False
+        otherwise.
+
+        Parameters:
+            floor (Floor) -> the floor to check.
+        """
+        return bool(self.stopMask >> self.heightIndex[floor.get_height()] & 1)
+
+    def has_stops(self) :
+        """Returns True if the elevator has any floors to travel to, False
+        otherwise.
+        """
+        return bool(self.stopMask)
+
+    def get_stop_count(self) :
+        """Returns the number of floors the elevator needs to travel to.
+        """
+        return self.stopMask.bit_count()
+
+    def get_snapshot(self) :
+        """Returns the elevator's state in one call (for telemetry, which reads
+        every car every tick) -> (height of the last floor, position (None
+        without a travel table), direction, opened, number of stops).
+        """
+        return (self.lastFloor.height, self.get_position(), self.direction,
+                self.opened, self.stopMask.bit_count())
+
+    def get_actions(self, floor) :
+        """Returns the actions this elevator needs to complete on a floor
+        ('P' for picking up and 'D' for dropping off).
+
+        Parameters:
+            floor (Floor) -> the floor to check.
+        """
+        bit = 1 << self.heightIndex[floor.get_height()]
+        actions = ""
+        for state in STATES :
+            if self.stops[state] & bit :
+                actions += state
+
+        return actions
 
     def move(self) :
         """Moves the elevator in the current direction.
         """
+        if self.travelTable is not None :
+            self.travel()
+            return
+
+        height = self.get_last_floor().get_height()
+        index = self.heightIndex[height]
+
         if self.get_direction() == 'U' :
             # Caps upper limit of elevator
-            self.set_last_floor(min(self.get_last_floor().get_height() + 1,
-                                max(self.floorPlan.keys())))
+            if height < self.topFloor :
+                self.set_last_floor(self.heights[index + 1])
             
         elif self.get_direction() == 'D' :
             # Caps lower limit of elevator
-            self.set_last_floor(max(self.get_last_floor().get_height() - 1,
-                                min(self.floorPlan.keys())))
+            if height > self.bottomFloor :
+                self.set_last_floor(self.heights[index - 1])
+
+    def travel(self) :
+        """Moves the elevator continuously towards the next floor for one tick.
+        """
+        nextFloor = self.get_next_floor()
+
+        # A trip is finished even without anywhere left to go (i.e. a car
+        # stopping after being taken out of service)
+        if nextFloor is None :
+            if self.trip is None :
+                return
+            end = self.trip[1]
+        else :
+            end = nextFloor.get_height()
+
+        # Start a trip from rest. If the next floor has changed part way through
+        # a trip, the trip is planned again from where the car is, at the speed
+        # it's going. If it can't stop there in time, it finishes the trip and
+        # comes back.
+        if self.trip is None :
+            self.start_trip(self.travelTable.get_elevation(
+                self.get_last_floor().get_height()), 0.0, end)
+        elif self.trip[1] != end :
+            startElevation, _, time, elevation, plan, sign = self.trip
+            if (self.travelTable.get_elevation(end) - elevation) * sign > 0 :
+                self.start_trip(elevation, self.profile.plan_speed(plan, time),
+                               end)
+
+            # The floor the trip ends on isn't needed anymore (i.e. parking was
+            # called off), so the car stops as soon as it can instead
+            if self.trip[1] != end and \
+               not self.has_floor(self.floorDetails[self.trip[1]]) :
+                self.stop_trip()
+
+        trip = self.trip
+        trip[2] += TICK_TIME
+        startElevation, end, time, _, plan, sign = trip
+
+        if time >= self.profile.plan_duration(plan) :
+            # Arrived
+            self.trip = None
+            self.set_last_floor(end)
+        else :
+            trip[3] = startElevation + sign * self.profile.plan_distance(plan,
+                                                                         time)
+
+            # Handshake the floors we have passed
+            self.set_last_floor(self.travelTable.get_floor_passed(
+                trip[3], 'U' if sign > 0 else 'D'))
+
+    def start_trip(self, elevation, speed, end) :
+        """Plans a trip to stop on a floor, from an elevation at a speed (keeping
+        the current trip if the car can't stop there in time).
+
+        Parameters:
+            elevation (float) -> the elevation the trip starts from (metres).
+            speed (float) -> the speed of the car towards the floor.
+            end (int) -> the height of the floor to stop on.
+        """
+        distance = self.travelTable.get_elevation(end) - elevation
+        plan = self.profile.plan_trip(distance, speed)
+        if plan is not None :
+            self.trip = [elevation, end, 0.0, elevation, plan,
+                         -1 if distance < 0 else 1]
+
+    def stop_trip(self) :
+        """Plans the trip in progress (if any) to stop on the closest floor
+        ahead the car can still stop on in time, so it slows down where it is
+        rather than going back.
+        """
+        if self.trip is None :
+            return
+
+        _, end, time, elevation, plan, sign = self.trip
+        speed = self.profile.plan_speed(plan, time)
+
+        # The floors ahead, closest first (the end of the trip is always
+        # reachable)
+        index = self.heightIndex[self.get_last_floor().get_height()]
+        endIndex = self.heightIndex[end]
+        for index in range(index, endIndex + sign, sign) :
+            height = self.heights[index]
+            if height not in self.floorPlan or \
+               (self.travelTable.get_elevation(height) - elevation) * sign < 0 :
+                continue
+
+            if self.profile.plan_trip(self.travelTable.get_elevation(height) -
+                                      elevation, speed) is not None :
+                self.start_trip(elevation, speed, height)
+                return
 
     def add_floor(self, floor, states) :
         """Adds the floor details for which the elevator needs to visit.
@@ -333,32 +1163,34 @@ class Elevator :
             states (List<char>) -> the reason why we are going to this floor.
                            'D' for dropping off, 'P' for picking up.
         """
-        
-        # Only insert into list if we aren't already going to this floor
-        if floor not in self.floorActions :
-
-            index = 0
-            while index < len(self.floorActions) :
-
-                # Find the spot in the path when this floor will be visited
-                if (self.direction == 'U' and
-                    floor > self.lastFloor and
-                    floor < self.floorActions[index]) \
-                   or (self.direction == 'D' and
-                    floor < self.lastFloor and
-                    floor > self.floorActions[index]) :
-                    break
-
-                index += 1
-
-            # Insert
-            self.floorActions.insert(index, floor)
+        bit = 1 << self.heightIndex[floor.get_height()]
+        changed = False
+        for state in states :
+            stops = self.stops[state]
+            if not stops & bit :
+                self.stops[state] = stops | bit
+                changed = True
+
+        # The path (and the estimates) only change if the floor, or a reason for
+        # stopping there, is new
+        self.stopMask |= bit
+        if changed :
+            self.version += 1
+
+    def clear_floors(self) :
+        """Stops the elevator where it is (on the closest floor it can stop on,
+        if it's part way through a trip), forgetting every floor it needed to
+        visit.
+        """
+        for key in self.stops :
+            self.stops[key] = 0
 
-        # Add what we are doing at this floor
-        else :
-            for state in states :
-                if state not in floor.get_actions() :
-                    floor.add_action(state)
+        self.stopMask = 0
+        self.parkFloor = None
+        self.stop_trip()
+        self.set_opened(False)
+        self.set_direction(None)
+        self.version += 1
 
     def remove_floor(self, floor, states) :
         """Removes the floor number as a floor the elevator has already visited.
@@ -367,15 +1199,21 @@ class Elevator :
             floor (Floor) -> the floor to remove.
             states (List<char>) -> the reason(s) why we are travelling to this floor.
         """
-        if floor in self.floorActions :
+        bit = 1 << self.heightIndex[floor.get_height()]
+        if not self.stopMask & bit :
+            return
 
-            # Remove each state
-            for state in states :
-                floor.remove_action(state)
+        # Remove each state
+        for state in states :
+            self.stops[state] &= ~bit
+        self.version += 1
 
-            # Remove the floor if there are no actions for it anymore
-            if not floor.get_actions() :
-                self.floorActions.remove(floor)
+        # Remove the floor if there are no actions for it anymore
+        for stops in self.stops.values() :
+            if stops & bit :
+                return
+
+        self.stopMask &= ~bit
 
     def floor_str(self, floor) :
         """Returns the string representation at a given floor.
@@ -390,58 +1228,43 @@ class Elevator :
                 return "[  ]"
             else :
                 return " [] "
-                
-        else :
-            return "    "
 
         # Prints the actions required for each floor
-        if floor in self.floorActions :
-            floorRepr = " "
-
-            # Adds each action to the representation
-            for action in floor.get_actions() :
-                floorRepr += action
+        elif self.has_floor(floor) :
+            floorRepr = " " + self.get_actions(floor)
 
             # Aligns starting string representations on each floor
-            for _ in range(2 - len(floor.get_actions())) :
-                floorRepr += " "
+            return floorRepr.ljust(4)
 
-            return floorRepr
+        else :
+            return "    "
 
     def get_picking_up(self) :
-        """Returns the floors where we are picking up passengers.
+        """Returns the floors where we are picking up passengers (lowest
+        first).
         """
-        floors = []
-        for floor in self.get_floors() :
-
-            # Adds floors with a pick up priority
-            if floor.get_priority() == 1 :
-                floors.append(floor)
-
-        return floors
+        return self.mask_floors(self.stops['P'])
 
     def get_dropping_off(self) :
-        """Returns the floors where we are dropping off passengers.
+        """Returns the floors where we are dropping off passengers (lowest
+        first).
         """
-        floors = []
-        for floor in self.get_floors() :
-            
-            # Adds floors with a drop off priority
-            if floor.get_priority() == 0 :
-                floors.append(floor)
-
-        return floors
+        return self.mask_floors(self.stops['D'])
 
     def tick(self) :
-        """Allows the elevator to act for one tick."""
+        """Allows the elevator to act for one tick.
 
-        # Check which direction we need to move in
-        if self.get_floors() :
+        Returns the floor the doors opened on this tick (None if they didn't
+        open).
+        """
+
+        # Shortcuts
+        lastFloor = self.get_last_floor()
 
-            # Shortcuts
-            lastFloor = self.get_last_floor()
-            elevation = self.get_next_floor().get_height() -\
-                        lastFloor.get_height()
+        # Check which direction we need to move in
+        nextFloor = self.get_next_floor()
+        if nextFloor is not None :
+            elevation = nextFloor.get_height() - lastFloor.get_height()
 
             # Set the direction based on the next floor we need to travel to
             if elevation < 0 :
@@ -451,46 +1274,104 @@ class Elevator :
             else :
                 self.set_direction(None)
 
-        # Determine the next action we need to take
-        if not self.get_last_floor() in self.get_floors() :
+        # Parked once it's waiting on the floor
+        if self.parkFloor is not None and self.parkFloor == lastFloor and \
+           self.trip is None :
+            self.parkFloor = None
+
+        # Determine the next action we need to take (the doors don't open on
+        # floors passed part way through a trip)
+        if self.trip is not None or not self.has_floor(lastFloor) :
             if self.get_opened() :
                 self.set_opened(False)
             else :
                 self.move()
         else :
             self.set_opened(True)
-            # Only want to remove the actions we actually completed -> will need to be changed
-            self.remove_floor(lastFloor, lastFloor.get_actions())           
+            # Everyone gets on and off when the doors open
+            self.remove_floor(lastFloor, STATES)
+            return lastFloor
+
+        return None
             
-    def determine_ticks(self, request) :
+    def get_version(self) :
+        """Returns the version of the elevator's path (changes whenever the
+        elevator's estimates could change).
+        """
+        return self.version
+
+    def determine_ticks(self, request, weights=ESTIMATE_WEIGHTS) :
         """Heuristic -> determine the number of ticks we estimate it to take to
-        complete the given request.
+        complete the given request (remembered until the elevator's path
+        changes).
 
         Parameters:
             request (Request) -> the request we want to test.
+            weights (Tuple) -> the opening time, stop penalty, pick up weight
+                               and drop off weight to estimate with (see
+                               ESTIMATE_WEIGHTS).
         """
-        
+        height = request.get_floor().get_height()
+
+        # Can't complete requests on floors the shaft doesn't reach
+        if height not in self.floorPlan :
+            return None
+
+        key = (height, request.get_direction())
+
+        # Estimate for the current path (and the same weights, which are
+        # compared by identity as a policy keeps using the same tuple)
+        cached = self.etaCache.get(key)
+        if cached is not None and cached[0] == self.version and \
+           cached[1] is weights :
+            self.etaCache.move_to_end(key)
+            return cached[2]
+
+        ticks = self.estimate_ticks(request, weights)
+
+        self.etaCache[key] = (self.version, weights, ticks)
+        self.etaCache.move_to_end(key)
+        if len(self.etaCache) > ETA_CACHE_SIZE :
+            self.etaCache.popitem(last=False)
+
+        return ticks
+
+    def estimate_ticks(self, request, weights=ESTIMATE_WEIGHTS) :
+        """Works out the heuristic for determine_ticks.
+
+        Parameters:
+            request (Request) -> the request we want to test.
+            weights (Tuple) -> the opening time, stop penalty, pick up weight
+                               and drop off weight to estimate with.
+        """
+        opening, penalty, pickUpWeight, dropOffWeight = weights
+        if opening is None :
+            opening = self.get_opening_time()
+        if penalty is None :
+            penalty = STOP_PENALTY
+
         # Set the tick counter to zero and create some shortcuts
         ticks = 0
         floor = request.get_floor()
         lastFloor = self.get_last_floor()
         nextFloor = self.get_next_floor()
-        elevation = self.get_last_floor() - floor
 
-        # Get the direction we are going in as a unit vector
-        if elevation :
-            direction = elevation // abs(elevation)
+        # Positive if the floor is above the elevator
+        elevation = floor - lastFloor
 
-        # Going straight there without stops
-        if not self.get_floors() or \
+        # Going straight there without stops (an elevator which is only
+        # parking is idle)
+        if not self.stopMask or \
            (request.direction == self.direction and
            ((elevation > 0 and request.direction == 'U' and
            floor < nextFloor) or (elevation < 0 and
            request.direction == 'D' and floor > nextFloor) or
             elevation == 0)) :
             
-            ticks = elevation // self.get_speed() + \
-                    self.get_opening_time()
+            if self.travelTable is not None :
+                ticks = self.travel_ticks(lastFloor, floor) + opening
+            else :
+                ticks = abs(elevation) // self.get_speed() + opening
         
         # Otherwise, determine if the requestor's direction is the same as the
         # current direction of the elevator.
@@ -499,20 +1380,36 @@ class Elevator :
               (elevation < 0 and request.direction == 'D') or
               elevation == 0) :
 
-            # Tracks the floors we have visited in this path
-            floorInd = 0
-            
-            for height in range(0, elevation, direction) :
-
-                # Keeps track of the time it takes to move one floor
-                ticks += 1 / self.get_speed()
-
-                if floorInd < len(self.get_floors()) and \
-                   self.get_floors()[floorInd].get_height() == height :
-
-                    # Flooring tick once we open the doors and shut them
-                    ticks = ticks // 1 + 2 * self.get_opening_time()
-                    floorInd += 1
+            # The stops on the way (between the elevator and the floor)
+            start = self.heightIndex[lastFloor.get_height()]
+            end = self.heightIndex[floor.get_height()]
+            low, high = min(start, end), max(start, end)
+            stops = self.stopMask & (((1 << high) - 1) >> (low + 1) << (low + 1))
+            pickUps = stops & self.stops['P']
+            pickUpTicks = penalty * opening * pickUpWeight
+            dropOffTicks = penalty * opening * dropOffWeight
+
+            # Travel times are looked up for each leg between the stops
+            if self.travelTable is not None :
+                floors = self.mask_floors(stops)
+                if end < start :
+                    floors.reverse()
+
+                previous = lastFloor
+                for stop in floors :
+                    if pickUps >> self.heightIndex[stop.get_height()] & 1 :
+                        ticks += self.travel_ticks(previous, stop) + pickUpTicks
+                    else :
+                        ticks += self.travel_ticks(previous, stop) + dropOffTicks
+                    previous = stop
+
+                return ticks + self.travel_ticks(previous, floor) + opening
+
+            # The time it takes to move each floor, then opening the doors and
+            # shutting them at each stop
+            ticks = abs(elevation) / self.get_speed() + \
+                    pickUps.bit_count() * pickUpTicks + \
+                    (stops & ~pickUps).bit_count() * dropOffTicks
 
         # More than one turn around to pick up (could be implemented for a
         # better heuristic).
@@ -561,6 +1458,15 @@ class Request :
         self.floor = floor
         self.direction = direction
         self.passengers = [passenger]
+
+        # The ticks the request was made and completed on (set by the transport
+        # system)
+        self.created = None
+        self.completedTick = None
+
+        # Requests for the same floor and direction made while this one was
+        # waiting, which were folded into it -> (tick made, passengers)
+        self.joined = []
         
         # Assuming a request starts as unassigned (unless otherwise given)
         if assigned is None or not assigned :
@@ -581,10 +1487,61 @@ class Request :
         self.elevator = elevator
         self.assigned = True
 
-    def complete(self) :
+    def unassign(self) :
+        """Takes this request away from the elevator it was assigned to.
+        """
+        self.elevator = None
+        self.assigned = False
+
+    def complete(self, tick=None) :
         """The designated elevator has completed the request.
+
+        Parameters:
+            tick (int) -> the tick the request was completed on.
         """
         self.completed = True
+        self.completedTick = tick
+
+    def set_created(self, tick) :
+        """Sets the tick the request was made on.
+
+        Parameters:
+            tick (int) -> the tick the request was made on.
+        """
+        self.created = tick
+
+    def get_created(self) :
+        """Returns the tick the request was made on.
+        """
+        return self.created
+
+    def join(self, request) :
+        """Folds another request for the same floor and direction into this
+        request (its passengers are picked up with this request's, but it
+        keeps the tick it was made on).
+
+        Parameters:
+            request (Request) -> the request to fold in.
+        """
+        self.add_passengers(request.get_passengers())
+        self.joined.append((request.get_created(), len(request.get_passengers())))
+
+    def get_calls(self) :
+        """Returns the (tick made, passengers) of this request, then of each
+        request folded into it.
+        """
+        joinedPassengers = sum(passengers for _, passengers in self.joined)
+        return [(self.created, len(self.passengers) - joinedPassengers)] + \
+               self.joined
+
+    def get_wait(self) :
+        """Returns the number of ticks the request waited to be completed (None
+        if it hasn't been completed).
+        """
+        if self.created is None or self.completedTick is None :
+            return None
+
+        return self.completedTick - self.created
 
     def get_floor(self) :
         """Returns the floor number the requestor is on.
@@ -656,7 +1613,9 @@ class Request :
 class TransportSystem :
     """Transport system to encapsulate elevators and passengers."""
 
-    def __init__(self, elevators=None, levels=None, requests=None) :
+    def __init__(self, elevators=None, levels=None, requests=None, building=None,
+                 display=True, profile=None, elevatorNumber=None,
+                 telemetry=None, log=None, policy=None) :
         """Creates a transportation system.
 
         Parameters:
@@ -665,13 +1624,63 @@ class TransportSystem :
             levels (Dict<int:str>) -> relates floor names to elevations.
             requests (List<Request>) -> queue to allow passengers at each floor
                                         to request to use the elevator.
+            building (Building) -> the building the system is in (made from the
+                                   levels if not given).
+            display (Bool) -> True if the system is printed every tick, False
+                              otherwise (printing is slow for tall buildings).
+            profile (MotionProfile) -> the motion profile of the default elevators
+                                       (they move a number of floors each tick if
+                                       not given).
+            elevatorNumber (int) -> the number of default elevators to make (if
+                                    not given, ELEVATOR_NUMBER).
+            telemetry (TelemetryWriter) -> written to at the end of every tick, so
+                                           external monitors can follow the
+                                           system.
+            log (RequestLog) -> summarises (and optionally spills to disk) the
+                                requests once they are completed, so they don't
+                                need to be kept.
+            policy (DispatchPolicy) -> decides which elevators complete which
+                                       requests, and where idle elevators wait
+                                       (if not given, GreedyPolicy).
         """
 
         # Deal with floor plan (levels)
-        if levels is None :
-            self.levels = LEVELS
+        if building is None :
+            building = Building(levels)
+
+        self.building = building
+        self.levels = self.building.get_levels()
+        self.display = display
+        self.profile = profile
+        self.telemetry = telemetry
+
+        # Ticks so far, and a summary of the completed requests
+        self.ticks = 0
+        if log is None :
+            self.log = RequestLog()
+        else :
+            self.log = log
+
+        # Requests reassigned and seconds taken the last time an elevator was
+        # taken out of service
+        self.lastRecovery = None
+
+        # Dispatching, and the requests assigned and CPU time spent assigning
+        # them
+        if policy is None :
+            self.policy = GreedyPolicy()
+        else :
+            self.policy = policy
+        self.dispatchAssignments = 0
+        self.dispatchTime = 0.0
+
+        # The (elevator, floor) of each time doors opened during the last tick
+        self.openings = []
+
+        if elevatorNumber is None :
+            self.elevatorNumber = ELEVATOR_NUMBER
         else :
-            self.levels = levels
+            self.elevatorNumber = elevatorNumber
 
         # Construct a dictionary which relates floor elevation with other floor
         # details
@@ -685,18 +1694,46 @@ class TransportSystem :
         else :
             self.elevators = elevators
 
-        # Deal with requests
-        if requests is None :
-            self.requests = []
-        else :
-            self.requests = requests
+        # Elevators which move continuously share a travel table for each profile
+        for elevator in self.elevators :
+            if elevator.get_profile() is not None :
+                elevator.set_travel_table(self.building.get_travel_table(
+                    elevator.get_profile()))
+
+        # Deal with requests -> kept as ordered sets (dicts), so requests can be
+        # found and removed without a scan. Assigned requests are also indexed by
+        # their elevator.
+        self.requests = {}
+        self.unassigned = {}
+        self.pendingCalls = 0
+        if requests is not None :
+            for request in requests :
+                self.request(request)
 
     def make_default_elevators(self) :
         """Creates a number of elevators.
         """
+        # Start on the default floor if the building has one
+        if LAST_FLOOR in self.floorDetails :
+            lastFloor = LAST_FLOOR
+        else :
+            lastFloor = self.building.get_lowest()
+
         elevators = []
-        for elevator in range(ELEVATOR_NUMBER) :
-            elevators.append(Elevator(self.floorDetails, LAST_FLOOR))
+        for shaft in range(self.elevatorNumber) :
+
+            # Restrict the elevator to the floors its shaft can reach (shafts
+            # are numbered by car, so every system made from the building
+            # gets the same service maps)
+            floorPlan = self.building.get_floor_plan(shaft)
+            if lastFloor in floorPlan :
+                start = lastFloor
+            else :
+                start = min(floorPlan)
+
+            elevator = Elevator(self.floorDetails, start, floorPlan=floorPlan,
+                                profile=self.profile, shaft=shaft)
+            elevators.append(elevator)
 
         return elevators
 
@@ -709,16 +1746,66 @@ class TransportSystem :
         """Passenger requesting to move from the given floor in the given
         direction.
 
+        A request for the same floor and direction as a request which is still
+        waiting is folded into it, so its passengers aren't lost.
+
         Parameters:
             request (Request) -> the request to add to our requests.
         """
-        if request not in self.requests :
-            self.requests.append(request)
+        if request.get_created() is None :
+            request.set_created(self.ticks)
+        self.pendingCalls += 1
+
+        if request in self.requests :
+            self.requests[request].join(request)
+
+        else :
+            self.requests[request] = request
+
+            if request.is_assigned() :
+                request.get_elevator().add_request(request)
+            else :
+                self.unassigned[request] = request
+
+    def get_pending(self) :
+        """Returns the number of requests made which haven't been completed
+        (counting requests folded into others).
+        """
+        return self.pendingCalls
+
+    def get_unassigned_count(self) :
+        """Returns the number of requests waiting for an elevator to be
+        assigned.
+        """
+        return len(self.unassigned)
 
     def get_requests(self) :
         """Returns the requests which have not been completed.
         """
-        return self.requests
+        return list(self.requests)
+
+    def get_ticks(self) :
+        """Returns the number of ticks the system has run for.
+        """
+        return self.ticks
+
+    def get_openings(self) :
+        """Returns the (elevator, floor) of each time doors opened during the
+        last tick, in the order they opened.
+        """
+        return self.openings
+
+    def get_log(self) :
+        """Returns the log summarising the completed requests.
+        """
+        return self.log
+
+    def get_wait_counters(self) :
+        """Returns the number of completed requests, the total ticks they waited
+        and the longest any of them waited.
+        """
+        sketch = self.log.get_sketch()
+        return sketch.get_count(), sketch.get_total(), sketch.get_max()
 
     def assign_request(self, request, elevator, state) :
         """Assigns a request to an elevator.
@@ -732,76 +1819,191 @@ class TransportSystem :
                              -> picking up from level 2 etc.)
         """
         if not request.is_assigned() :
+            # A parking elevator is idle, so it stops parking to go straight
+            # there
+            elevator.set_park_floor(None)
             elevator.add_floor(request.get_floor(), state)
             request.assign(elevator)
+            elevator.add_request(request)
+            self.unassigned.pop(request, None)
 
-    def tick(self) :
-        """Ticks the system.
+    def get_policy(self) :
+        """Returns the policy which dispatches the elevators.
         """
+        return self.policy
 
-        print(self)
+    def get_dispatch_cost(self) :
+        """Returns the number of requests the policy has assigned and the CPU
+        time (in seconds) spent dispatching (including requests tried again on
+        later ticks).
+        """
+        return self.dispatchAssignments, self.dispatchTime
 
-        # Making a shallow copy to iterate through incase a request was recently
-        # completed
-        requests = self.requests.copy()        
-        reqsRemoved = 0
-        
-        # Check each request
-        for rID, request in enumerate(requests) :
-            floor = request.get_floor()
+    def find_elevator(self, request) :
+        """Returns the elevator the policy would assign a request to (None if
+        it wouldn't be assigned yet).
+
+        Parameters:
+            request (Request) -> the request to find an elevator for.
+        """
+        return self.policy.assign(self, request)
 
-            # Try assign requests which have not been assigned yet
-            if not request.is_assigned() :
+    def reassign_requests(self, requests) :
+        """Assigns a batch of unassigned requests with the policy (requests
+        which can't be assigned yet are tried again each tick).
 
-                # Determine the optimal elevator to assign this request to
-                optElevator = None
-                minTicks = math.inf
+        Parameters:
+            requests (List<Request>) -> the requests to reassign.
+        """
+        if not requests :
+            return
 
-                for elevator in self.get_elevators() :
-                    elevatorTicks = elevator.determine_ticks(request)
+        unassigned = len(self.unassigned)
 
-                    # Found a new optimal elevator
-                    if elevatorTicks and elevatorTicks < minTicks :
-                        optElevator = elevator
-                        minTicks = elevatorTicks
+        # Timed for the whole batch, rather than calling the timer for every
+        # request
+        start = process_time()
+        self.policy.reassign(self, requests)
+        self.dispatchTime += process_time() - start
 
-                # If we found an optimal elevator, then assign the request
-                if optElevator :
-                    self.assign_request(request, optElevator, 'P')
+        # Only the requests which were assigned are counted (not those tried
+        # again each tick)
+        self.dispatchAssignments += unassigned - len(self.unassigned)
 
-            # Check if we have completed assigned requests
-            else :
-                
-                if request.get_elevator().get_last_floor() == \
-                   floor :
-
-                    # Change the request to completed
-                    request.complete()
-                    compRequest = self.requests.pop(rID - reqsRemoved)
-                    reqsRemoved += 1
-                    
-                    # Determines which floors the passenger can nominate
-                    possibleFloors = []
-                    elevator = request.get_elevator()
-                    for floor in list(self.levels.keys()) :
-                        if (request.get_direction() == 'U' and \
-                           floor > request.get_floor().get_height()) or \
-                           (request.get_direction() == 'D' and \
-                             floor < request.get_floor().get_height()) :
-                            possibleFloors.append(floor)
-
-                    # Choose a random floor for each passenger
-                    for passenger in request.get_passengers() :
-                        floor = self.floorDetails[random.choice(
-                            possibleFloors)]
-                        passenger.nominate_floor(elevator, floor)
-        
-        # Allow each elevator to operate on whatever actions it has to complete
+    def park_elevators(self) :
+        """Sends idle elevators to wherever the policy wants them to wait (the
+        floor isn't a stop, so the doors don't open there, and it's called off
+        when the elevator is assigned a request).
+        """
         for elevator in self.get_elevators() :
+            if elevator.is_operational() and not elevator.has_stops() and \
+               not elevator.get_opened() and elevator.get_park_floor() is None :
+                floor = self.policy.park(self, elevator)
+                if floor is not None :
+                    elevator.set_park_floor(floor)
+
+    def take_out_of_service(self, elevator) :
+        """Takes an elevator out of service (i.e. for maintenance, or after a
+        fault). The elevator stops where it is, and the requests it was assigned
+        are reassigned to the other elevators in one batch. Passengers still on
+        board are assumed to be evacuated.
+
+        Returns the number of requests which were taken from the elevator.
+
+        Parameters:
+            elevator (Elevator) -> the elevator to take out of service.
+        """
+        start = perf_counter()
+
+        elevator.set_operational(False)
+        elevator.clear_floors()
+
+        # Found through the elevator's own index, rather than searching every
+        # request
+        requests = elevator.pop_all_requests()
+        for request in requests :
+            request.unassign()
+            self.unassigned[request] = request
+
+        self.reassign_requests(requests)
+
+        self.lastRecovery = (len(requests), perf_counter() - start)
+        return len(requests)
+
+    def return_to_service(self, elevator) :
+        """Returns an elevator to service, so it can be dispatched to again.
+
+        Parameters:
+            elevator (Elevator) -> the elevator to return to service.
+        """
+        elevator.set_operational(True)
+
+    def get_last_recovery(self) :
+        """Returns the number of requests reassigned and the time taken (in
+        seconds) the last time an elevator was taken out of service (None if it
+        hasn't happened).
+        """
+        return self.lastRecovery
+
+    def complete_requests(self, elevator, floor) :
+        """Completes the requests an elevator was assigned on the floor it has
+        opened on, and lets their passengers nominate where to get off.
+
+        Parameters:
+            elevator (Elevator) -> the elevator which opened its doors.
+            floor (Floor) -> the floor the doors opened on.
+
+        Returns the requests which were completed.
+        """
+        requests = elevator.pop_requests(floor)
+
+        for request in requests :
+
+            # Change the request to completed (removing it first, as completing
+            # a request changes its hash)
+            self.requests.pop(request, None)
+            request.complete(self.ticks)
+            self.pendingCalls -= len(request.get_calls())
+
+            # Only the summary is kept once the request has been completed
+            self.log.record(request)
+
+            # Determines which floors the passenger can nominate
+            possibleFloors = self.building.get_reachable(
+                floor.get_height(), request.get_direction(), elevator.get_shaft())
+
+            # Choose a random floor for each passenger
+            if possibleFloors :
+                for passenger in request.get_passengers() :
+                    destination = self.floorDetails[random.choice(possibleFloors)]
+                    passenger.nominate_floor(elevator, destination)
+
+        return requests
+
+    def tick(self) :
+        """Ticks the system.
+
+        Returns the requests which were completed during the tick.
+        """
+
+        if self.display :
+            print(self)
+
+        # Try assign requests which have not been assigned yet (copied, as
+        # assigning removes them)
+        self.reassign_requests(list(self.unassigned))
+        self.park_elevators()
+
+        # Allow each elevator to operate on whatever actions it has to complete.
+        # Requests are only completed when an elevator opens its doors.
+        completed = []
+        self.openings = []
+        for elevator in self.get_elevators() :
+
+            # Elevators out of service stay where they are (once they've stopped)
+            if not elevator.is_operational() and not elevator.is_travelling() :
+                continue
+
+            # Elevators which move continuously cover a whole tick in one go
+            if elevator.get_profile() is not None :
+                ticks = 1
+            else :
+                ticks = elevator.get_speed()
 
             # Will make this multi-threaded to see each elevator tick at once
-            for _ in range(elevator.get_speed()) :
-                elevator.tick()
+            for _ in range(ticks) :
+                openedFloor = elevator.tick()
+
+                if openedFloor is not None :
+                    self.openings.append((elevator, openedFloor))
+                    completed.extend(self.complete_requests(elevator,
+                                                            openedFloor))
+
+        self.ticks += 1
+        if self.telemetry is not None :
+            self.telemetry.write(self)
+
+        return completed
 
     def add_request(self, weights=None, direction=None) :
         """Adds a request on a floor given the probability at each height.
@@ -814,27 +2016,24 @@ class TransportSystem :
             direction (char) -> the desired direction for the request.
         """
 
-        # Limitation on which floors we want to spawn passengers
+        # Choose floor (equal chance of each floor if no weights are given)
         if not weights :
-            weights = {}
-            for height in self.levels.keys() :
-                
-                # Equal chance of each floor
-                weights[height] = 1/len(self.levels)
-
-        # Choose floor
-        floorNum = random.choices(list(weights.keys()), list(weights.values()))[0]
+            floorNum = random.choice(self.building.get_heights())
+        else :
+            floorNum = random.choices(list(weights.keys()),
+                                      list(weights.values()))[0]
 
-        # Remove the direction if it isn't valid for the level chosen
-        directions = DIRECTIONS.copy()
-        if floorNum == max(self.levels.keys()) :
+        # Remove the direction if it isn't valid for the level chosen (sorted so
+        # a seeded run always makes the same choices)
+        directions = sorted(DIRECTIONS)
+        if floorNum == self.building.get_highest() :
             directions.remove('U')
-        elif floorNum == min(self.levels.keys()) :
+        elif floorNum == self.building.get_lowest() :
             directions.remove('D')
 
         # Choose a direction
         if not direction or direction not in directions :
-            direction = random.choice(list(directions))
+            direction = random.choice(directions)
 
         # Make the request
         floor = self.floorDetails[floorNum]
@@ -846,13 +2045,15 @@ class TransportSystem :
 
         Parameters:
             requests (int) -> the number of requests to add at each step.
+
+        Returns the requests which were completed during the step.
         """
         
         # Add some random requests
         for _ in range(requests) :
             self.add_request()
             
-        self.tick()
+        return self.tick()
 
     def simulation(self, steps, requests) :
         """Simulates the system allocating elevators in order to move passengers.
@@ -884,11 +2085,12 @@ class TransportSystem :
         # All elevators need to be idle, closed, and not have any passengers
         # to pick up
         for elevator in self.elevators :
-            if elevator.get_opened() or elevator.get_floors() :
+            if elevator.get_opened() or elevator.has_stops() :
                 return False
 
         # Shows the solved state if the simulation has finished
-        print(self)
+        if self.display :
+            print(self)
         
         return True
 
@@ -935,3 +2137,8 @@ class TransportSystem :
             output += requestStr + "\n"
             
         return output
+
+
+if __name__ == "__main__" :
+    from cli import main
+    main()
@@ -0,0 +1,242 @@
+## Keeps long runs in bounded memory.
+##
+## Finished requests are summarised into streaming aggregates (counts and a
+## latency sketch) and then dropped. Optionally, the raw records are spilled to
+## an append-only log on disk, written in batches.
+
+import struct
+
+
+# Constants
+SUB_BUCKET_BITS = 4 # each power of two is split into 16 buckets (~6% error)
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+SPILL_BATCH = 4096 # the number of records written to disk at once
+
+# Spilled record -> created tick, completed tick, height, direction (1 for up,
+# -1 for down) and the number of passengers
+RECORD = struct.Struct('<qqibI')
+DIRECTION_CODES = {'U' : 1, 'D' : -1}
+DIRECTIONS = {1 : 'U', -1 : 'D'}
+
+
+class LatencySketch :
+    """Log-linear histogram of latencies (in ticks), which uses a fixed amount
+    of memory however many latencies are added."""
+
+    def __init__(self) :
+        """Creates an empty sketch.
+        """
+        self.buckets = []
+        self.count = 0
+        self.total = 0
+        self.maximum = 0
+
+    @staticmethod
+    def bucket(value) :
+        """Returns the index of the bucket a value belongs in.
+
+        Parameters:
+            value (int) -> the latency (in ticks).
+        """
+        if value < SUB_BUCKETS :
+            return value
+
+        shift = value.bit_length() - SUB_BUCKET_BITS - 1
+        return SUB_BUCKETS * (shift + 1) + (value >> shift) - SUB_BUCKETS
+
+    @staticmethod
+    def bucket_value(index) :
+        """Returns the middle of the values in a bucket.
+
+        Parameters:
+            index (int) -> the index of the bucket.
+        """
+        if index < SUB_BUCKETS :
+            return index
+
+        shift = index // SUB_BUCKETS - 1
+        low = (SUB_BUCKETS + index % SUB_BUCKETS) << shift
+        return low + ((1 << shift) - 1) / 2
+
+    def add(self, value, count=1) :
+        """Adds a latency to the sketch.
+
+        Parameters:
+            value (int) -> the latency (in ticks).
+            count (int) -> the number of times the latency happened.
+        """
+        index = LatencySketch.bucket(value)
+        if index >= len(self.buckets) :
+            self.buckets.extend([0] * (index + 1 - len(self.buckets)))
+
+        self.buckets[index] += count
+        self.count += count
+        self.total += value * count
+        self.maximum = max(self.maximum, value)
+
+    def merge(self, other) :
+        """Adds every latency from another sketch to this sketch.
+
+        Parameters:
+            other (LatencySketch) -> the sketch to merge in.
+        """
+        if len(other.buckets) > len(self.buckets) :
+            self.buckets.extend([0] * (len(other.buckets) - len(self.buckets)))
+
+        for index, count in enumerate(other.buckets) :
+            self.buckets[index] += count
+
+        self.count += other.count
+        self.total += other.total
+        self.maximum = max(self.maximum, other.maximum)
+
+    def get_count(self) :
+        """Returns the number of latencies added.
+        """
+        return self.count
+
+    def get_total(self) :
+        """Returns the sum of the latencies added.
+        """
+        return self.total
+
+    def get_max(self) :
+        """Returns the largest latency added.
+        """
+        return self.maximum
+
+    def get_mean(self) :
+        """Returns the mean latency (None if nothing has been added).
+        """
+        if not self.count :
+            return None
+
+        return self.total / self.count
+
+    def percentile(self, percent) :
+        """Returns (an estimate of) a percentile of the latencies, or None if
+        nothing has been added.
+
+        Parameters:
+            percent (float) -> the percentile (between 0 and 100).
+        """
+        if not self.count :
+            return None
+
+        # The rank of the latency we are looking for
+        rank = max(1, percent / 100 * self.count)
+        seen = 0
+        for index, count in enumerate(self.buckets) :
+            seen += count
+            if seen >= rank :
+                return min(LatencySketch.bucket_value(index), self.maximum)
+
+        return self.maximum
+
+
+class RequestLog :
+    """Summarises completed requests, and optionally spills them to disk."""
+
+    def __init__(self, spillPath=None, batchSize=SPILL_BATCH) :
+        """Creates a request log.
+
+        Parameters:
+            spillPath (str) -> the file to append the raw records to. If not
+                               given, only the aggregates are kept.
+            batchSize (int) -> the number of records to write at once.
+        """
+        self.sketch = LatencySketch()
+        self.passengers = 0
+        self.directions = {'U' : 0, 'D' : 0}
+
+        # Records waiting to be written
+        self.batchSize = batchSize
+        self.batch = bytearray()
+        self.batched = 0
+
+        if spillPath is None :
+            self.spill = None
+        else :
+            self.spill = open(spillPath, 'ab')
+
+    def record(self, request) :
+        """Adds a completed request to the log (the log doesn't keep the
+        request). Requests folded into it are recorded separately, each with
+        its own wait.
+
+        Parameters:
+            request (Request) -> the completed request.
+        """
+        completed = request.get_created() + request.get_wait()
+
+        for created, passengers in request.get_calls() :
+            self.sketch.add(completed - created)
+            self.passengers += passengers
+            self.directions[request.get_direction()] += 1
+
+            if self.spill is not None :
+                self.batch += RECORD.pack(created, completed,
+                                          request.get_floor().get_height(),
+                                          DIRECTION_CODES[request.get_direction()],
+                                          passengers)
+                self.batched += 1
+
+        if self.batched >= self.batchSize :
+            self.flush()
+
+    def flush(self) :
+        """Writes any batched records to disk.
+        """
+        if self.spill is not None and self.batch :
+            self.spill.write(self.batch)
+            self.spill.flush()
+
+        self.batch = bytearray()
+        self.batched = 0
+
+    def close(self) :
+        """Writes any batched records and closes the spill file.
+        """
+        self.flush()
+        if self.spill is not None :
+            self.spill.close()
+            self.spill = None
+
+    def get_sketch(self) :
+        """Returns the sketch of the time requests waited (in ticks).
+        """
+        return self.sketch
+
+    def get_count(self) :
+        """Returns the number of completed requests (counting requests folded
+        into others).
+        """
+        return self.sketch.get_count()
+
+    def get_passengers(self) :
+        """Returns the number of passengers picked up.
+        """
+        return self.passengers
+
+    def get_directions(self) :
+        """Returns the number of completed requests in each direction.
+        """
+        return self.directions
+
+
+def read_records(path) :
+    """Reads the records spilled to a file, as (created tick, completed tick,
+    height, direction, passengers).
+
+    Parameters:
+        path (str) -> the spill file.
+    """
+    with open(path, 'rb') as file :
+        data = file.read(RECORD.size * SPILL_BATCH)
+        while data :
+            for created, completed, height, direction, passengers in \
+                RECORD.iter_unpack(data) :
+                yield created, completed, height, DIRECTIONS[direction], \
+                      passengers
+
+            data = file.read(RECORD.size * SPILL_BATCH)
@@ -0,0 +1,181 @@
+## Telemetry for external monitors (dashboards, test harnesses, ...).
+##
+## The transport system writes a frame into a memory-mapped ring buffer at the
+## end of every tick, in a fixed binary layout (little-endian):
+##
+##   header -> magic, version, cars, slots, frame size, then the number of
+##             frames written so far (at SEQUENCE_OFFSET, 8 byte aligned as
+##             readers poll it without a lock).
+##   frame  -> tick, pending requests, unassigned requests, completed requests,
+##             total ticks waited, longest wait, then one record for each car
+##             (height, position, direction, opened, stops), then the tick again
+##             (a reader which sees two different ticks read the frame while it
+##             was being written).
+##
+## Monitors mmap the same file and read frames in place, without copies or IPC.
+
+import mmap
+import struct
+
+
+# Constants
+MAGIC = b'ELVT'
+VERSION = 2
+TELEMETRY_SLOTS = 1024 # the number of frames kept in the ring buffer
+
+HEADER = struct.Struct('<4sIIII')
+SEQUENCE = struct.Struct('<Q') # frames written
+SEQUENCE_OFFSET = 24
+HEADER_SIZE = 32
+FRAME = struct.Struct('<qIIQQI')
+CAR = struct.Struct('<idbbI')
+TICK = struct.Struct('<q')
+DIRECTION_CODES = {'U' : 1, 'D' : -1, None : 0}
+NAN = float('nan') # position of a car without a travel table
+EMPTY_CAR = (0, 0.0, 0, 0, 0)
+
+
+def frame_size(cars) :
+    """Returns the number of bytes in a frame.
+
+    Parameters:
+        cars (int) -> the number of cars in each frame.
+    """
+    return FRAME.size + cars * CAR.size + TICK.size
+
+
+class TelemetryWriter :
+    """Writes a frame of telemetry into a memory-mapped ring buffer every
+    tick."""
+
+    def __init__(self, path, cars, slots=TELEMETRY_SLOTS) :
+        """Creates the ring buffer file (replacing any existing file).
+
+        Parameters:
+            path (str) -> the path of the file to map.
+            cars (int) -> the number of cars in the transport system.
+            slots (int) -> the number of frames kept in the ring buffer.
+        """
+        self.cars = cars
+        self.slots = slots
+        self.frameSize = frame_size(cars)
+        self.sequence = 0
+
+        # Every car is packed in one go (the same layout as CAR, repeated)
+        self.carsStruct = struct.Struct('<' + CAR.format[1:] * cars)
+
+        size = HEADER_SIZE + slots * self.frameSize
+        with open(path, 'wb') as file :
+            file.truncate(size)
+
+        self.file = open(path, 'r+b')
+        self.buffer = mmap.mmap(self.file.fileno(), size)
+
+        HEADER.pack_into(self.buffer, 0, MAGIC, VERSION, cars, slots,
+                         self.frameSize)
+        SEQUENCE.pack_into(self.buffer, SEQUENCE_OFFSET, 0)
+
+    def write(self, system) :
+        """Writes a frame for the current state of a transport system.
+
+        Parameters:
+            system (TransportSystem) -> the system to write the state of.
+        """
+        buffer = self.buffer
+        tick = system.get_ticks()
+        completed, waitTotal, waitMax = system.get_wait_counters()
+
+        offset = HEADER_SIZE + (self.sequence % self.slots) * self.frameSize
+        FRAME.pack_into(buffer, offset, tick, system.get_pending(),
+                        system.get_unassigned_count(), completed, waitTotal,
+                        waitMax)
+        offset += FRAME.size
+
+        # Cars past the number the buffer was made for aren't written, and
+        # missing cars are written as zeros. Each car's state is read in one
+        # call, as this runs for every car every tick.
+        elevators = system.get_elevators()[:self.cars]
+        values = []
+        for elevator in elevators :
+            height, position, direction, opened, stops = elevator.get_snapshot()
+            if position is None :
+                position = NAN
+
+            values += (height, position, DIRECTION_CODES[direction], opened,
+                       stops)
+
+        values += EMPTY_CAR * (self.cars - len(elevators))
+        self.carsStruct.pack_into(buffer, offset, *values)
+
+        # Publish the frame
+        TICK.pack_into(buffer, HEADER_SIZE + (self.sequence % self.slots + 1) *
+                       self.frameSize - TICK.size, tick)
+        self.sequence += 1
+        SEQUENCE.pack_into(buffer, SEQUENCE_OFFSET, self.sequence)
+
+    def close(self) :
+        """Unmaps and closes the file.
+        """
+        self.buffer.close()
+        self.file.close()
+
+
+class TelemetryReader :
+    """Reads frames of telemetry from a memory-mapped ring buffer."""
+
+    def __init__(self, path) :
+        """Maps the ring buffer file.
+
+        Parameters:
+            path (str) -> the path of the file written by a TelemetryWriter.
+        """
+        self.file = open(path, 'rb')
+        self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.buffer)
+
+        magic, version, self.cars, self.slots, self.frameSize = \
+            HEADER.unpack_from(self.view, 0)
+        if magic != MAGIC or version != VERSION :
+            raise ValueError("{} isn't a telemetry file".format(path))
+
+    def get_sequence(self) :
+        """Returns the number of frames written so far.
+        """
+        return SEQUENCE.unpack_from(self.view, SEQUENCE_OFFSET)[0]
+
+    def read_frame(self, sequence) :
+        """Returns a frame as (tick, pending, unassigned, completed, waitTotal,
+        waitMax, cars), where cars is a list of (height, position, direction,
+        opened, stops) - or None if the frame has been overwritten or was being
+        written.
+
+        Parameters:
+            sequence (int) -> the number of the frame (starting from 0).
+        """
+        latest = self.get_sequence()
+        if sequence < 0 or sequence >= latest or latest - sequence >= self.slots :
+            return None
+
+        offset = HEADER_SIZE + (sequence % self.slots) * self.frameSize
+        frame = FRAME.unpack_from(self.view, offset)
+        cars = [CAR.unpack_from(self.view, offset + FRAME.size + car * CAR.size)
+                for car in range(self.cars)]
+        tick = TICK.unpack_from(self.view, offset + self.frameSize - TICK.size)[0]
+
+        # Torn frame, or the writer has started overwriting it
+        if tick != frame[0] or self.get_sequence() - sequence >= self.slots :
+            return None
+
+        return frame + (cars,)
+
+    def latest(self) :
+        """Returns the most recent frame (None if nothing has been written).
+        """
+        return self.read_frame(self.get_sequence() - 1)
+
+    def close(self) :
+        """Unmaps and closes the file.
+        """
+        self.view.release()
+        self.buffer.close()
+        self.file.close()
@@ -0,0 +1,7 @@
+## The modules are run from the top of the repository (python -m elevator), so
+## the tests import them from there too.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,76 @@
+from banks import Bank, BankCoordinator, LobbyRiders, RingBuffer, HEIGHT, \
+                  STOPS
+from elevator import Building, TransportSystem
+
+
+def make_ring(slots=4, fields=3) :
+    return RingBuffer(memoryview(bytearray(RingBuffer.size(slots, fields))),
+                      slots, fields)
+
+
+def test_ring_buffer_is_first_in_first_out() :
+    ring = make_ring()
+
+    assert ring.pop() is None
+    assert ring.push((1, 2, 3))
+    assert ring.push((4, 5, 6))
+    assert ring.pop() == (1, 2, 3)
+    assert ring.drain() == [(4, 5, 6)]
+    assert ring.drain() == []
+
+
+def test_ring_buffer_full_and_wrapping() :
+    ring = make_ring()
+
+    for value in range(4) :
+        assert ring.push((value, 0, 0))
+    assert not ring.push((4, 0, 0))
+
+    # Records wrap around the slots once there is room
+    assert ring.pop() == (0, 0, 0)
+    assert ring.push((4, 0, 0))
+    assert [record[0] for record in ring.drain()] == [1, 2, 3, 4]
+
+    ring.release()
+
+
+def test_riders_transfer_when_they_get_off() :
+    # The lobby is the only floor below the request, so every passenger goes
+    # there
+    system = TransportSystem(building=Building(lowest=-1, highest=0),
+                             display=False, elevatorNumber=1)
+    riders = LobbyRiders(system.floorDetails[-1])
+    elevator, = system.get_elevators()
+
+    system.add_request({0 : 1}, 'D')
+    alighted = []
+    for _ in range(10) :
+        completed = system.tick()
+        alighted += riders.update(system, completed)
+
+        # Nobody transfers until the car opens at the lobby
+        if riders.get_riding() :
+            assert not alighted
+        if alighted :
+            assert elevator.get_last_floor().get_height() == -1
+            break
+
+    assert len(alighted) == 1
+    assert riders.get_riding() == 0
+
+
+def test_coordinator_copies_car_state() :
+    banks = [Bank(0, 10, cars=2, requests=1, transferRate=0.5, seed=seed)
+             for seed in range(2)]
+    coordinator = BankCoordinator(banks)
+
+    states = []
+    coordinator.run(20, callback=lambda tick, coordinator :
+                    states.append(coordinator.get_car_state(1, 1)))
+
+    assert len(states) == 20
+    assert 0 <= states[-1][HEIGHT] <= 10
+    assert states[-1][STOPS] >= 0
+
+    # Closes even though car states are still held
+    coordinator.close()
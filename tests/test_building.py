@@ -0,0 +1,81 @@
+from dispatch import GreedyPolicy
+from elevator import Building, Request, TransportSystem
+
+
+def make_system(building, cars=2) :
+    return TransportSystem(building=building, display=False,
+                           elevatorNumber=cars)
+
+
+def test_levels_skip_floors() :
+    building = Building(lowest=-1, highest=3, skipFloors={2})
+
+    assert building.get_heights() == [-1, 0, 1, 3]
+    assert list(building.get_levels()) == [3, 1, 0, -1]
+    assert building.get_levels()[-1] == "B1"
+    assert building.get_levels()[0] == "G"
+
+
+def test_reachable_slices() :
+    building = Building(lowest=0, highest=4)
+
+    assert building.get_reachable(2, 'U') == (3, 4)
+    assert building.get_reachable(2, 'D') == (0, 1)
+    assert building.get_reachable(4, 'U') == ()
+
+
+def test_service_maps_are_keyed_by_car() :
+    building = Building(lowest=0, highest=10, serviceMaps={0 : [0, 8, 9, 10]})
+
+    # A second system made from the same building gets the same maps
+    for _ in range(2) :
+        first, second = make_system(building).get_elevators()
+        assert sorted(first.get_floor_plan()) == [0, 8, 9, 10]
+        assert len(second.get_floor_plan()) == 11
+
+    assert building.get_reachable(8, 'D', 0) == (0,)
+
+
+def test_dispatch_skips_cars_which_cannot_reach() :
+    building = Building(lowest=0, highest=10, serviceMaps={0 : [0, 8, 9, 10]})
+    system = make_system(building)
+    first, second = system.get_elevators()
+
+    system.add_request({3 : 1}, 'U')
+    system.tick()
+
+    request, = system.get_requests()
+    assert request.get_elevator() is second
+    assert not first.has_stops()
+
+
+def test_estimates_count_floors_either_way() :
+    system = make_system(Building(lowest=0, highest=10), cars=1)
+    car, = system.get_elevators()
+    floors = system.floorDetails
+    car.set_last_floor(5)
+
+    # Idle -> the same distance up or down
+    up = car.determine_ticks(Request(floors[8], 'D', {}))
+    down = car.determine_ticks(Request(floors[2], 'U', {}))
+    assert up == down == 3 + car.get_opening_time()
+
+    # Going up to 9 -> a call at 7 going up is on the way
+    car.add_floor(floors[9], 'D')
+    car.set_direction('U')
+    assert car.determine_ticks(Request(floors[7], 'U', {})) == \
+           2 + car.get_opening_time()
+    assert car.determine_ticks(Request(floors[3], 'U', {})) is None
+
+
+def test_greedy_assigns_an_estimate_of_zero() :
+    policy = GreedyPolicy(openingTime=0)
+    system = TransportSystem(building=Building(lowest=0, highest=4),
+                             display=False, elevatorNumber=1, policy=policy)
+    car, = system.get_elevators()
+
+    # The car is already there, with the doors estimated to take no time
+    request = Request(system.floorDetails[car.get_last_floor().get_height()],
+                      'U', {})
+    assert car.determine_ticks(request, policy.weights) == 0
+    assert policy.assign(system, request) is car
@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from cli import main, parse_args, timing_statistics
+
+
+@pytest.mark.parametrize("args", [["run", "--profile", "2.5"],
+                                  ["run", "--profile", "2.5,fast"],
+                                  ["run", "--lowest", "5", "--highest", "1"],
+                                  ["run", "--cars", "0"],
+                                  ["benchmark", "--repeats", "0"],
+                                  ["sweep", "--min-cars", "3", "--max-cars",
+                                   "1"]])
+def test_bad_options_are_usage_errors(args, capsys) :
+    with pytest.raises(SystemExit) as exit :
+        parse_args(args)
+
+    assert exit.value.code == 2
+    assert "error:" in capsys.readouterr().err
+
+
+def test_profile_and_single_floor_are_allowed() :
+    options = parse_args(["run", "--lowest", "1", "--highest", "1",
+                          "--profile", "2.5,1.0,2.0"])
+
+    assert options.profile == "2.5,1.0,2.0"
+
+
+def test_empty_benchmark(capsys) :
+    assert timing_statistics([], False)["tick_us_mean"] is None
+
+    main(["benchmark", "--steps", "0", "--repeats", "1", "--format", "json"])
+
+    row = json.loads(capsys.readouterr().out)
+    assert row["ticks_timed"] == 0
+    assert row["ticks_per_second"] is None
@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+from dispatch import ParkingPolicy
+from elevator import Building, MotionProfile, TransportSystem
+
+
+def make_parking_car(profile=None) :
+    random.seed(1)
+    system = TransportSystem(building=Building(lowest=0, highest=15),
+                             display=False, elevatorNumber=1, profile=profile,
+                             policy=ParkingPolicy(home=0))
+    car, = system.get_elevators()
+    car.set_last_floor(10)
+    return system, car
+
+
+def test_parked_car_waits_with_the_doors_shut() :
+    system, car = make_parking_car()
+
+    openings = []
+    for _ in range(20) :
+        system.tick()
+        openings += system.get_openings()
+
+    assert car.get_last_floor().get_height() == 0
+    assert car.get_park_floor() is None
+    assert not car.has_stops() and not openings
+
+
+@pytest.mark.parametrize("profile, most", [(None, 6),
+                                           (MotionProfile(2.5, 1.0), 15)])
+def test_call_while_parking_is_not_delayed(profile, most) :
+    system, car = make_parking_car(profile)
+    system.tick()
+    system.tick()
+    assert car.get_park_floor().get_height() == 0
+
+    # Parking is called off, rather than finishing the trip home first
+    system.add_request({12 : 1}, 'U')
+    ticks = 0
+    openings = []
+    while system.get_pending() :
+        system.tick()
+        ticks += 1
+        openings += [floor.get_height() for _, floor in system.get_openings()]
+
+    assert ticks <= most
+    assert openings == [12]
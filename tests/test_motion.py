@@ -0,0 +1,121 @@
+import math
+
+import pytest
+
+from elevator import Building, MotionProfile, TransportSystem, TravelTable
+
+
+def test_trapezoid_and_triangle_times() :
+    profile = MotionProfile(2.0, 1.0)
+
+    # Reaches the rated speed after 4 metres
+    assert math.isclose(profile.travel_time(10.0), 10 / 2 + 2)
+    assert math.isclose(profile.travel_time(1.0), 2.0)
+    assert math.isclose(profile.travel_time(-10.0), profile.travel_time(10.0))
+
+
+def test_s_curve_is_slower_than_trapezoid() :
+    trapezoid = MotionProfile(2.5, 1.0)
+    curve = MotionProfile(2.5, 1.0, jerk=2.0)
+
+    for distance in (0.5, 3.5, 35.0) :
+        assert curve.travel_time(distance) > trapezoid.travel_time(distance)
+
+
+@pytest.mark.parametrize("jerk", [None, 2.0])
+def test_planned_trip_ends_at_rest(jerk) :
+    profile = MotionProfile(2.5, 1.0, jerk)
+    plan = profile.plan_trip(20.0)
+    duration = profile.plan_duration(plan)
+
+    assert math.isclose(duration, profile.travel_time(20.0))
+    assert math.isclose(profile.plan_distance(plan, duration), 20.0)
+    assert profile.plan_speed(plan, duration) == 0.0
+
+    # Never goes backwards
+    times = [duration * step / 50 for step in range(51)]
+    distances = [profile.plan_distance(plan, time) for time in times]
+    assert distances == sorted(distances)
+
+
+def test_plan_from_speed() :
+    profile = MotionProfile(2.5, 1.0)
+
+    # Stopping from 2 m/s takes 2 metres
+    assert profile.plan_trip(1.5, speed=2.0) is None
+
+    plan = profile.plan_trip(10.0, speed=2.0)
+    assert math.isclose(profile.plan_speed(plan, 0.0), 2.0)
+    assert math.isclose(profile.plan_distance(plan,
+                                              profile.plan_duration(plan)), 10.0)
+
+
+def test_travel_table() :
+    building = Building(lowest=0, highest=5, storeyHeights={2 : 7.0})
+    profile = MotionProfile(2.5, 1.0)
+    table = TravelTable(building, profile)
+
+    assert table.get_elevation(3) == 3.5 * 2 + 7.0
+    assert table.get_time(0, 0) == 0.0
+    assert table.get_time(1, 4) == table.get_time(4, 1)
+    assert math.isclose(table.get_time(0, 5),
+                        profile.travel_time(table.get_elevation(5)))
+
+    # The last floor passed depends on the direction
+    assert table.get_floor_passed(5.0, 'U') == 1
+    assert table.get_floor_passed(5.0, 'D') == 2
+    assert table.get_floor_passed(7.0, 'U') == 2
+    assert table.get_floor_passed(7.0, 'D') == 2
+
+    # Made once for each profile
+    assert building.get_travel_table(profile) is building.get_travel_table(
+        MotionProfile(2.5, 1.0))
+
+
+def run_car(system, ticks, insert=None) :
+    """Ticks a one car system, inserting a stop once the car passes an
+    elevation, and returns the car's elevations."""
+    elevator, = system.get_elevators()
+    elevations = []
+    for _ in range(ticks) :
+        system.tick()
+        elevations.append(elevator.get_position())
+
+        if insert is not None and elevations[-1] > insert[0] :
+            elevator.add_floor(system.floorDetails[insert[1]], 'D')
+            insert = None
+
+    return elevations
+
+
+def make_car() :
+    system = TransportSystem(building=Building(lowest=0, highest=20),
+                             display=False, elevatorNumber=1,
+                             profile=MotionProfile(2.5, 1.0))
+    elevator, = system.get_elevators()
+    elevator.add_floor(system.floorDetails[15], 'D')
+    return system, elevator
+
+
+def test_stop_inserted_mid_trip_is_stopped_at() :
+    system, elevator = make_car()
+
+    elevations = run_car(system, 12, insert=(8.0, 5))
+
+    # Stops at floor 5 without going backwards
+    stopped = elevations.index(17.5)
+    assert elevations[:stopped + 1] == sorted(elevations[:stopped + 1])
+    assert elevator.get_last_floor().get_height() == 5
+
+
+def test_stop_too_close_is_passed() :
+    system, elevator = make_car()
+
+    elevations = run_car(system, 60, insert=(16.0, 5))
+
+    # Carries on to floor 15 (never opening part way), then comes back
+    top = elevations.index(max(elevations))
+    assert elevations[:top + 1] == sorted(elevations[:top + 1])
+    assert max(elevations) == 52.5
+    assert elevations[-1] == 17.5
+    assert not elevator.has_stops()
@@ -0,0 +1,103 @@
+import pytest
+
+from elevator import Building, TransportSystem
+
+
+def make_car(lowest=0, highest=10, skipFloors=None) :
+    system = TransportSystem(building=Building(lowest=lowest, highest=highest,
+                                               skipFloors=skipFloors),
+                             display=False, elevatorNumber=1)
+    return system, system.get_elevators()[0]
+
+
+def heights(floors) :
+    return [floor.get_height() for floor in floors]
+
+
+def test_add_and_remove_stops() :
+    system, car = make_car()
+    floors = system.floorDetails
+
+    car.add_floor(floors[4], 'P')
+    car.add_floor(floors[4], 'D')
+    car.add_floor(floors[7], 'D')
+
+    assert car.has_floor(floors[4]) and not car.has_floor(floors[5])
+    assert car.get_stop_count() == 2
+    assert car.get_actions(floors[4]) == "PD"
+    assert heights(car.get_picking_up()) == [4]
+    assert heights(car.get_dropping_off()) == [4, 7]
+
+    # The floor stays a stop until every reason for it is gone
+    car.remove_floor(floors[4], 'P')
+    assert car.has_floor(floors[4]) and car.get_actions(floors[4]) == "D"
+    car.remove_floor(floors[4], 'D')
+    assert not car.has_floor(floors[4])
+    assert heights(car.mask_floors(car.stopMask)) == [7]
+
+    car.clear_floors()
+    assert not car.has_stops() and car.get_next_floor() is None
+
+
+def test_version_only_changes_with_the_path() :
+    system, car = make_car()
+    floors = system.floorDetails
+
+    car.add_floor(floors[3], 'P')
+    version = car.get_version()
+    car.add_floor(floors[3], 'P')
+    assert car.get_version() == version
+
+    car.remove_floor(floors[6], 'P')
+    assert car.get_version() == version
+
+
+@pytest.mark.parametrize("direction, start, stops, order", [
+    ('U', 5, [2, 8, 9], [8, 9, 2]),
+    ('D', 5, [2, 8, 9], [2, 8, 9]),
+    (None, 5, [2, 7, 9], [7, 9, 2]),   # the closest stop first when idle
+    (None, 5, [3, 8, 9], [3, 8, 9]),
+    (None, 5, [3, 7], [7, 3]),         # up when they're as close
+    ('U', 5, [5, 2, 8], [5, 8, 2]),    # this floor first
+    ('U', 5, [1, 3], [3, 1]),          # nothing ahead, so turns around
+])
+def test_floors_follow_next_floor(direction, start, stops, order) :
+    system, car = make_car()
+    floors = system.floorDetails
+    car.set_last_floor(start)
+    car.set_direction(direction)
+    for height in stops :
+        car.add_floor(floors[height], 'D')
+
+    assert heights(car.get_floors()) == order
+    if start not in stops :
+        assert car.get_next_floor().get_height() == order[0]
+
+
+def test_next_floor_counts_skipped_floors_out() :
+    # 4 isn't a floor, so 5 is as close to 3 as 2 is
+    system, car = make_car(skipFloors={4})
+    floors = system.floorDetails
+    car.set_last_floor(3)
+    car.add_floor(floors[2], 'D')
+    car.add_floor(floors[5], 'D')
+
+    assert car.get_next_floor().get_height() == 5
+    assert heights(car.get_floors()) == [5, 2]
+
+
+def test_idle_car_serves_stops_in_order() :
+    system, car = make_car()
+    floors = system.floorDetails
+    car.set_last_floor(5)
+    for height in (2, 7, 9) :
+        car.add_floor(floors[height], 'D')
+
+    expected = heights(car.get_floors())
+    served = []
+    for _ in range(40) :
+        opened = car.tick()
+        if opened is not None :
+            served.append(opened.get_height())
+
+    assert served == expected
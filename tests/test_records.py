@@ -0,0 +1,102 @@
+import random
+
+from elevator import Building, Floor, Passenger, Request, TransportSystem
+from records import LatencySketch, RequestLog, read_records, SUB_BUCKETS
+
+
+def test_small_values_have_their_own_buckets() :
+    for value in range(SUB_BUCKETS) :
+        assert LatencySketch.bucket(value) == value
+        assert LatencySketch.bucket_value(value) == value
+
+
+def test_buckets_are_ordered_and_close() :
+    previous = -1
+    for value in range(1, 100000) :
+        index = LatencySketch.bucket(value)
+        assert index >= previous
+        previous = index
+
+        # Within the relative error of a bucket (1 / SUB_BUCKETS)
+        middle = LatencySketch.bucket_value(index)
+        assert abs(middle - value) <= value / SUB_BUCKETS
+
+
+def test_percentiles() :
+    sketch = LatencySketch()
+    assert sketch.percentile(50) is None
+    assert sketch.get_mean() is None
+
+    values = list(range(1, 1001))
+    random.Random(1).shuffle(values)
+    for value in values :
+        sketch.add(value)
+
+    assert sketch.get_count() == 1000
+    assert sketch.get_max() == 1000
+    assert sketch.get_mean() == 500.5
+    for percent in (50, 90, 99) :
+        assert abs(sketch.percentile(percent) - percent * 10) <= \
+               percent * 10 / SUB_BUCKETS
+    assert sketch.percentile(100) == 1000
+
+
+def test_merge_is_the_same_as_adding() :
+    first, second, both = LatencySketch(), LatencySketch(), LatencySketch()
+    for value in range(500) :
+        first.add(value)
+        both.add(value)
+    for value in range(200, 5000, 7) :
+        second.add(value, 2)
+        both.add(value, 2)
+
+    first.merge(second)
+    assert first.buckets == both.buckets
+    assert (first.get_count(), first.get_total(), first.get_max()) == \
+           (both.get_count(), both.get_total(), both.get_max())
+
+
+def test_log_spills_in_batches(tmp_path) :
+    path = str(tmp_path / "spill")
+    log = RequestLog(path, batchSize=3)
+
+    for created in range(5) :
+        floor = Floor(2)
+        request = Request(floor, 'U', Passenger('U', floor))
+        request.set_created(created)
+        request.complete(10)
+        log.record(request)
+
+    # Only whole batches are written until the log is flushed
+    assert len(list(read_records(path))) == 3
+    log.close()
+
+    records = list(read_records(path))
+    assert records[0] == (0, 10, 2, 'U', 1)
+    assert len(records) == 5
+    assert log.get_sketch().get_total() == sum(10 - created
+                                               for created in range(5))
+
+
+def test_repeated_requests_are_merged() :
+    random.seed(1)
+    system = TransportSystem(building=Building(lowest=0, highest=10),
+                             display=False, elevatorNumber=2)
+
+    system.add_request({7 : 1}, 'D')
+    system.tick()
+    system.add_request({7 : 1}, 'D')
+
+    request, = system.get_requests()
+    assert len(request.get_passengers()) == 2
+    assert request.get_calls() == [(0, 1), (1, 1)]
+    assert system.get_pending() == 2
+
+    while system.get_pending() :
+        system.tick()
+
+    # Each call waited from the tick it was made on
+    log = system.get_log()
+    assert log.get_count() == 2
+    assert log.get_passengers() == 2
+    assert log.get_sketch().get_total() == 2 * request.get_wait() - 1
@@ -0,0 +1,87 @@
+import random
+
+from elevator import Building, MotionProfile, TransportSystem
+
+
+def make_system(cars=2, profile=None) :
+    random.seed(1)
+    return TransportSystem(building=Building(lowest=0, highest=10),
+                           display=False, elevatorNumber=cars, profile=profile)
+
+
+def test_requests_move_to_the_other_cars() :
+    system = make_system(cars=3)
+    broken = system.get_elevators()[0]
+
+    for height in (3, 6, 9) :
+        system.add_request({height : 1}, 'D')
+    for request in system.get_requests() :
+        system.assign_request(request, broken, 'P')
+
+    taken = system.take_out_of_service(broken)
+    assert taken == 3
+    assert not broken.has_stops()
+
+    # Never assigned back to the car out of service
+    while system.get_pending() :
+        for request in system.get_requests() :
+            assert request.get_elevator() is not broken
+        system.tick()
+
+
+def test_recovery_is_recorded() :
+    system = make_system()
+    system.add_request({5 : 1}, 'U')
+    system.tick()
+
+    elevator = system.get_requests()[0].get_elevator()
+    taken = system.take_out_of_service(elevator)
+
+    requests, seconds = system.get_last_recovery()
+    assert requests == taken == 1
+    assert seconds >= 0
+
+
+def test_waiting_requests_are_tried_again() :
+    system = make_system(cars=1)
+    car, = system.get_elevators()
+    system.take_out_of_service(car)
+
+    # No car can take the request, so it waits unassigned
+    system.add_request({4 : 1}, 'D')
+    for _ in range(3) :
+        system.tick()
+    request, = system.get_requests()
+    assert not request.is_assigned()
+
+    # Assigned on a later tick once the car is back
+    system.return_to_service(car)
+    system.tick()
+    assert request.get_elevator() is car
+
+    while system.get_pending() :
+        system.tick()
+    assert system.get_log().get_count() == 1
+
+
+def test_moving_car_stops_ahead() :
+    system = make_system(cars=1, profile=MotionProfile(2.5, 1.0))
+    car, = system.get_elevators()
+    car.add_floor(system.floorDetails[10], 'D')
+    for _ in range(6) :
+        system.tick()
+
+    position = car.get_position()
+    system.take_out_of_service(car)
+
+    # Slows down and stops on a floor, without going back
+    positions = [car.get_position()]
+    for _ in range(10) :
+        system.tick()
+        positions.append(car.get_position())
+
+    assert positions[0] == position
+    assert positions == sorted(positions)
+    assert not car.is_travelling()
+    assert positions[-1] == Building(lowest=0, highest=10).get_elevation(
+        car.get_last_floor().get_height())
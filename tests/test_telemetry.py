@@ -0,0 +1,92 @@
+import math
+import random
+
+from elevator import Building, MotionProfile, TransportSystem
+from telemetry import HEADER, HEADER_SIZE, SEQUENCE, SEQUENCE_OFFSET, \
+                      TelemetryReader, TelemetryWriter
+
+
+def make_system(cars=2, profile=None) :
+    random.seed(1)
+    return TransportSystem(building=Building(lowest=0, highest=10),
+                           display=False, elevatorNumber=cars, profile=profile)
+
+
+def test_frames_match_the_system(tmp_path) :
+    path = str(tmp_path / "telemetry")
+    system = make_system(profile=MotionProfile(2.5, 1.0))
+    system.telemetry = TelemetryWriter(path, 2, slots=4)
+    reader = TelemetryReader(path)
+
+    system.add_request({8 : 1}, 'D')
+    for _ in range(3) :
+        system.tick()
+
+    tick, pending, unassigned, completed, waitTotal, waitMax, cars = \
+        reader.latest()
+    assert tick == system.get_ticks()
+    assert pending == system.get_pending()
+    assert unassigned == system.get_unassigned_count()
+    for elevator, car in zip(system.get_elevators(), cars) :
+        height, position, direction, opened, stops = car
+        assert height == elevator.get_last_floor().get_height()
+        assert math.isclose(position, elevator.get_position())
+        assert stops == elevator.get_stop_count()
+
+    system.telemetry.close()
+    reader.close()
+
+
+def test_overwritten_frames_are_not_read(tmp_path) :
+    path = str(tmp_path / "telemetry")
+    system = make_system()
+    writer = TelemetryWriter(path, 2, slots=4)
+    reader = TelemetryReader(path)
+
+    for _ in range(6) :
+        system.tick()
+        writer.write(system)
+
+    assert reader.get_sequence() == 6
+    # The oldest slot is the next to be written, so isn't read
+    assert reader.read_frame(2) is None
+    assert reader.read_frame(3)[0] == 4
+    assert reader.read_frame(6) is None
+    assert math.isnan(reader.latest()[6][0][1])
+
+    writer.close()
+    reader.close()
+
+
+def test_missing_cars_are_zeros(tmp_path) :
+    path = str(tmp_path / "telemetry")
+    writer = TelemetryWriter(path, 3)
+    reader = TelemetryReader(path)
+
+    writer.write(make_system(cars=2))
+
+    assert reader.latest()[6][2] == (0, 0.0, 0, 0, 0)
+
+    writer.close()
+    reader.close()
+
+
+def test_sequence_is_aligned() :
+    # Polled by readers without a lock, so it mustn't straddle a word
+    assert SEQUENCE_OFFSET % SEQUENCE.size == 0
+    assert HEADER.size <= SEQUENCE_OFFSET
+    assert SEQUENCE_OFFSET + SEQUENCE.size <= HEADER_SIZE
+
+
+def test_snapshot_matches_the_accessors() :
+    for profile in (None, MotionProfile(2.5, 1.0)) :
+        system = make_system(profile=profile)
+        system.add_request({6 : 1}, 'U')
+        for _ in range(3) :
+            system.tick()
+
+        for elevator in system.get_elevators() :
+            assert elevator.get_snapshot() == \
+                (elevator.get_last_floor().get_height(),
+                 elevator.get_position(), elevator.get_direction(),
+                 elevator.get_opened(), elevator.get_stop_count())
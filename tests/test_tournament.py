@@ -0,0 +1,40 @@
+import pytest
+
+from dispatch import GreedyPolicy, NearestCarPolicy
+from elevator import Building, TransportSystem
+from tournament import run_tournament
+from workload import generate_workload, run_workload
+
+
+def test_assignments_are_counted_once() :
+    building = Building(lowest=0, highest=12)
+    workload = generate_workload(building, 30, 2, seed=3)
+    system = TransportSystem(building=building, display=False,
+                             elevatorNumber=2)
+
+    run_workload(system, workload)
+    assignments, seconds = system.get_dispatch_cost()
+
+    # Requests waiting for a car are tried every tick, but only assigned once
+    assert system.get_pending() == 0
+    assert 0 < assignments <= len(workload)
+    assert seconds >= 0
+
+
+def test_tournament_compares_the_same_requests() :
+    building = Building(lowest=0, highest=8)
+    workloads = [generate_workload(building, 20, 1, seed=seed)
+                 for seed in (1, 2)]
+    policies = {"greedy" : GreedyPolicy(), "nearest" : NearestCarPolicy()}
+
+    rows = run_tournament(policies, workloads, 0, 8, 2, seed=5, processes=1)
+
+    for row in rows :
+        assert row["completed"] + row["pending"] == row["requests"] == 40
+        assert row["assignments"] <= row["requests"]
+        assert row["dispatch_us_per_tick"] is not None
+
+    # Stopped before every request was made
+    with pytest.raises(ValueError) :
+        run_tournament(policies, workloads, 0, 8, 2, seed=5, maxTicks=5,
+                       processes=1)
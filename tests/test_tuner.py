@@ -0,0 +1,85 @@
+import tuner
+from dispatch import GreedyPolicy
+from elevator import Building
+from records import LatencySketch
+from tuner import load_policy, save_tuning, score, tune
+from workload import generate_workload
+
+
+def make_sketch(*waits) :
+    sketch = LatencySketch()
+    for wait in waits :
+        sketch.add(wait)
+    return sketch
+
+
+def test_pending_requests_rank_first() :
+    fast = score(make_sketch(1, 2, 3), pending=1)
+    slow = score(make_sketch(50, 60, 70))
+
+    assert slow < fast
+    assert score(make_sketch(1, 2, 3)) < slow
+    assert score(LatencySketch())[1] == float("inf")
+
+
+def test_halving_keeps_a_third_each_round(monkeypatch) :
+    played = {}
+
+    # Every candidate waits as long as its number, but the defaults (0) are
+    # the worst, so they're cut in the first round
+    def play_match(candidate, policy, lowest, highest, cars, workload, seed,
+                   profile=None, maxTicks=None) :
+        played.setdefault(seed, set()).add(candidate)
+        wait = 100 if candidate == 0 else candidate
+        return candidate, make_sketch(wait), 1, 1, 0, 1, 0.0
+
+    monkeypatch.setattr(tuner, "play_match", play_match)
+    result = tune([[(0, 1, 'U')]], 0, 4, 1, seed=0, processes=1)
+
+    # 27 candidates, then 9, then 3, then 1 (the defaults are kept throughout)
+    assert played[0] == set(range(27))
+    assert played[1] == played[2] == {0} | set(range(1, 10))
+    assert all(played[index] == {0, 1, 2, 3} for index in range(3, 9))
+    assert len(played) == 9
+
+    assert result["parameters"] == tuner.sample_candidates(27, 0)[1]
+    assert result["workloads"] == 9
+    assert result["simulations"] == 27 + 10 * 2 + 4 * 6
+    assert result["default_wait_p90"] == 100
+
+
+def test_tune_in_process() :
+    building = Building(lowest=0, highest=6)
+    workloads = [generate_workload(building, 10, 1, seed=1)]
+
+    result = tune(workloads, 0, 6, 2, candidates=3, seed=2, processes=1)
+
+    assert result["key"] == "0..6x2"
+    assert result["pending"] == result["default_pending"] == 0
+    assert result["simulations"] == 3
+
+
+def test_saving_replaces_only_its_own_key(tmp_path) :
+    path = str(tmp_path / "tuned.json")
+    first = {"key" : "0..10x2", "parameters" : {"openingTime" : 1.5}}
+    second = {"key" : "0..20x3", "parameters" : {"stopPenalty" : 3.0}}
+
+    save_tuning(path, first)
+    save_tuning(path, second)
+    save_tuning(path, dict(first, parameters={"openingTime" : 2.5}))
+
+    assert load_policy(path, "0..10x2").get_parameters()["openingTime"] == 2.5
+    assert load_policy(path, "0..20x3").get_parameters()["stopPenalty"] == 3.0
+    assert load_policy(path, "0..30x4") is None
+
+
+def test_loaded_policy_has_the_saved_parameters(tmp_path) :
+    path = str(tmp_path / "tuned.json")
+    parameters = {"openingTime" : 1.25, "stopPenalty" : 0.5,
+                  "pickUpWeight" : 2.0, "dropOffWeight" : 0.75}
+    save_tuning(path, {"key" : "0..10x2", "parameters" : parameters})
+
+    policy = load_policy(path, "0..10x2")
+
+    assert isinstance(policy, GreedyPolicy)
+    assert policy.get_parameters() == parameters
@@ -0,0 +1,62 @@
+import json
+import random
+
+from cli import main
+from elevator import Building, TransportSystem
+from workload import check_workload, generate_workload, load_settings, \
+                     load_workload, run_workload, save_workload
+
+
+def make_system(building, cars=2) :
+    random.seed(1)
+    return TransportSystem(building=building, display=False,
+                           elevatorNumber=cars)
+
+
+def test_every_request_in_a_workload_is_completed() :
+    building = Building(lowest=-2, highest=12)
+    workload = generate_workload(building, 50, 2, seed=4)
+    system = make_system(building)
+
+    run_workload(system, workload)
+
+    assert system.get_log().get_count() == len(workload)
+    assert system.get_pending() == 0
+
+
+def test_saved_workload_loads_the_same(tmp_path) :
+    building = Building(lowest=-2, highest=12)
+    workload = generate_workload(building, 20, 2, seed=4)
+    path = str(tmp_path / "workload")
+
+    save_workload(path, workload)
+
+    assert load_workload(path) == workload
+
+
+def test_settings_are_saved_with_the_workload(tmp_path) :
+    building = Building(lowest=-2, highest=12)
+    workload = generate_workload(building, 20, 2, seed=4)
+    path = str(tmp_path / "workload")
+
+    save_workload(path, workload, {"lowest" : -2, "highest" : 12, "cars" : 3})
+
+    assert load_settings(path) == {"lowest" : -2, "highest" : 12, "cars" : 3}
+    assert load_workload(path) == workload
+    assert check_workload(building, workload) == []
+    assert check_workload(Building(lowest=0, highest=2), [(0, 5, 'D'),
+                                                          (0, 1, 'U'),
+                                                          (1, -2, 'U')]) == \
+           [-2, 5]
+
+
+def test_replay_uses_the_recorded_building(tmp_path, capsys) :
+    path = str(tmp_path / "workload")
+
+    main(["run", "--highest", "40", "--cars", "3", "--seed", "2",
+          "--record", path, "--format", "json"])
+    recorded = capsys.readouterr().out
+    main(["replay", path, "--format", "json"])
+
+    assert json.loads(capsys.readouterr().out)["wait_mean"] == \
+           json.loads(recorded)["wait_mean"]
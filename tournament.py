@@ -0,0 +1,163 @@
+## Tournaments -> run dispatch policies head to head on exactly the same
+## workloads (seeded or recorded), so the best policy for a building can be
+## picked with data.
+##
+## Each policy/workload match is simulated in its own worker process. The wait
+## sketches of each policy's matches are merged, and each policy is reported with
+## its wait percentiles, throughput (completed requests per tick) and the CPU
+## time it spent dispatching (for each request assigned, and each tick).
+##
+## Waits are only compared when every policy finished the same number of
+## requests -> a policy which leaves its slowest requests pending would
+## otherwise look faster.
+
+import random
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+from dispatch import GreedyPolicy, NearestCarPolicy, ParkingPolicy
+from elevator import Building, TransportSystem
+from records import LatencySketch
+from workload import run_workload
+
+
+# Constants
+POLICIES = {"greedy" : GreedyPolicy,
+            "nearest" : NearestCarPolicy,
+            "parking" : ParkingPolicy}
+PERCENTILES = (50, 90, 99)
+
+
+def play_match(name, policy, lowest, highest, cars, workload, seed,
+               profile=None, maxTicks=None) :
+    """Simulates one policy on one workload (run in a worker process).
+
+    Returns (name, wait sketch, ticks, passengers, pending requests, requests
+    assigned, dispatch CPU seconds).
+
+    Parameters:
+        name (str) -> the name the policy is reported under.
+        policy (DispatchPolicy) -> the policy to dispatch with.
+        lowest (int) -> the lowest floor of the building.
+        highest (int) -> the highest floor of the building.
+        cars (int) -> the number of elevators.
+        workload (List<Tuple>) -> the (tick, height, direction) of each request.
+        seed (int) -> the seed for the passengers' destinations (the same for
+                      every policy).
+        profile (MotionProfile) -> the elevators' motion profile (they move a
+                                   number of floors each tick if not given).
+        maxTicks (int) -> the most ticks to run for.
+    """
+    random.seed(seed)
+    system = TransportSystem(building=Building(lowest=lowest, highest=highest),
+                             display=False, profile=profile,
+                             elevatorNumber=cars, policy=policy)
+
+    ticks = run_workload(system, workload, maxTicks)
+    assignments, seconds = system.get_dispatch_cost()
+
+    return name, system.get_log().get_sketch(), ticks, \
+           system.get_log().get_passengers(), system.get_pending(), \
+           assignments, seconds
+
+
+def run_tournament(policies, workloads, lowest, highest, cars, seed=None,
+                   profile=None, maxTicks=None, processes=None) :
+    """Simulates every policy on every workload in parallel, and returns one row
+    of results for each policy (in the order given).
+
+    Raises a ValueError if a policy's requests don't add up (some weren't made
+    before maxTicks), or if the policies left different numbers of requests
+    pending (so their waits are for different requests).
+
+    Parameters:
+        policies (Dict<str:DispatchPolicy>) -> the policies, by name.
+        workloads (List<List<Tuple>>) -> the workloads every policy is run on.
+        lowest (int) -> the lowest floor of the building.
+        highest (int) -> the highest floor of the building.
+        cars (int) -> the number of elevators.
+        seed (int) -> the seed for the passengers' destinations (chosen at
+                      random if not given, but still the same for every policy).
+        profile (MotionProfile) -> the elevators' motion profile.
+        maxTicks (int) -> the most ticks to run each match for.
+        processes (int) -> the number of worker processes (if not given, one
+                           for each CPU).
+    """
+    if seed is None :
+        seed = random.randrange(2 ** 32)
+
+    # Totals for each policy -> sketch, ticks, passengers, pending, assignments,
+    # seconds
+    totals = {name : [LatencySketch(), 0, 0, 0, 0, 0.0] for name in policies}
+    requests = sum(len(workload) for workload in workloads)
+
+    with ProcessPoolExecutor(processes) as executor :
+        matches = [executor.submit(play_match, name, policy, lowest, highest,
+                                   cars, workload, seed + index, profile,
+                                   maxTicks)
+                   for name, policy in policies.items()
+                   for index, workload in enumerate(workloads)]
+
+        for match in matches :
+            name, sketch, ticks, passengers, pending, assignments, \
+                seconds = match.result()
+            total = totals[name]
+            total[0].merge(sketch)
+            total[1] += ticks
+            total[2] += passengers
+            total[3] += pending
+            total[4] += assignments
+            total[5] += seconds
+
+    check_totals(totals, requests)
+
+    rows = []
+    for name, (sketch, ticks, passengers, pending, assignments,
+               seconds) in totals.items() :
+        row = {"policy" : name,
+               "workloads" : len(workloads),
+               "requests" : requests,
+               "completed" : sketch.get_count(),
+               "pending" : pending,
+               "passengers" : passengers,
+               "ticks" : ticks,
+               "throughput" : sketch.get_count() / ticks if ticks else None,
+               "wait_mean" : sketch.get_mean()}
+        for percent in PERCENTILES :
+            row["wait_p{}".format(percent)] = sketch.percentile(percent)
+        row["wait_max"] = sketch.get_max()
+        row["assignments"] = assignments
+        row["dispatch_us"] = seconds / assignments * 1e6 if assignments else None
+        row["dispatch_us_per_tick"] = seconds / ticks * 1e6 if ticks else None
+        rows.append(row)
+
+    return rows
+
+
+def check_totals(totals, requests) :
+    """Checks every policy was ranked on the same requests, raising a
+    ValueError if not (and warning if requests were left pending).
+
+    Parameters:
+        totals (Dict<str:List>) -> the totals of each policy (sketch, ticks,
+                                   passengers, pending, ...).
+        requests (int) -> the number of requests in the workloads.
+    """
+    for name, (sketch, _, _, pending, *_) in totals.items() :
+        if sketch.get_count() + pending != requests :
+            raise ValueError("{} completed {} and left {} pending of {} "
+                             "requests (the rest weren't made before the last "
+                             "tick), run for more ticks".format(
+                                 name, sketch.get_count(), pending, requests))
+
+    pending = {name : total[3] for name, total in totals.items()}
+    if len(set(pending.values())) > 1 :
+        raise ValueError("the policies left different numbers of requests "
+                         "pending ({}), so their waits can't be compared, "
+                         "run for more ticks".format(", ".join(
+                             "{} {}".format(name, count)
+                             for name, count in pending.items())))
+
+    if any(pending.values()) :
+        warnings.warn("every policy left {} requests pending, which may not "
+                      "be the same requests".format(next(iter(pending.values()))))
@@ -0,0 +1,212 @@
+## Tuning -> searches the parameters of GreedyPolicy (the opening time and stop
+## penalty its estimates assume, and the weights of pick ups and drop offs) for
+## the lowest 90th percentile wait on a target workload.
+##
+## Uses successive halving: every candidate is simulated on a few workloads, the
+## best third go on to be simulated on three times as many, and so on until one
+## is left - so most of the budget goes on the candidates which look good. Each
+## simulation runs in a worker process (or in this one, if only one process is
+## asked for). The best parameters are saved to a JSON
+## file, under a key for the building profile (floors, cars and motion profile).
+
+import json
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+from dispatch import GreedyPolicy
+from elevator import DEFAULT_TIME, STOP_PENALTY
+from records import LatencySketch
+from tournament import play_match
+
+
+# Constants
+PARAMETERS = {"openingTime" : (0.25, 4.0), # the range searched for each
+              "stopPenalty" : (0.0, 4.0),  # parameter
+              "pickUpWeight" : (0.0, 3.0),
+              "dropOffWeight" : (0.0, 3.0)}
+DEFAULT_PARAMETERS = {"openingTime" : DEFAULT_TIME,
+                      "stopPenalty" : STOP_PENALTY,
+                      "pickUpWeight" : 1,
+                      "dropOffWeight" : 1}
+CANDIDATES = 27
+REDUCTION = 3 # one in REDUCTION candidates go on to the next round
+
+
+def profile_key(lowest, highest, cars, profile=None) :
+    """Returns the key tuned parameters are saved under for a building profile.
+
+    Parameters:
+        lowest (int) -> the lowest floor of the building.
+        highest (int) -> the highest floor of the building.
+        cars (int) -> the number of elevators.
+        profile (MotionProfile) -> the elevators' motion profile.
+    """
+    key = "{}..{}x{}".format(lowest, highest, cars)
+    if profile is not None :
+        key += "@{},{},{}".format(profile.get_max_speed(),
+                                  profile.get_acceleration(), profile.get_jerk())
+
+    return key
+
+
+def sample_candidates(number, seed=None) :
+    """Returns parameters to try -> the defaults, then random parameters from
+    the ranges in PARAMETERS.
+
+    Parameters:
+        number (int) -> the number of candidates.
+        seed (int) -> the seed for choosing the parameters.
+    """
+    generator = random.Random(seed)
+
+    candidates = [dict(DEFAULT_PARAMETERS)]
+    while len(candidates) < number :
+        candidates.append({name : round(generator.uniform(low, high), 3)
+                           for name, (low, high) in PARAMETERS.items()})
+
+    return candidates
+
+
+def score(sketch, pending=0) :
+    """Returns the score of a candidate (lower is better) -> the requests left
+    pending (so leaving the slowest requests unfinished never looks faster),
+    then the 90th percentile wait, then the mean wait to break ties.
+
+    Parameters:
+        sketch (LatencySketch) -> the waits of the candidate's simulations.
+        pending (int) -> the requests the candidate's simulations didn't
+                         complete.
+    """
+    if not sketch.get_count() :
+        return (pending, math.inf, math.inf)
+
+    return (pending, sketch.percentile(90), sketch.get_mean())
+
+
+def tune(workloads, lowest, highest, cars, candidates=CANDIDATES,
+         reduction=REDUCTION, rounds=1, seed=None, profile=None, maxTicks=None,
+         processes=None) :
+    """Searches for the best parameters with successive halving.
+
+    Returns a summary of the search, with the best parameters.
+
+    Parameters:
+        workloads (List<List<Tuple>>) -> the target workloads (used in turn, with
+                                         a different seed for the passengers'
+                                         destinations each time around).
+        lowest (int) -> the lowest floor of the building.
+        highest (int) -> the highest floor of the building.
+        cars (int) -> the number of elevators.
+        candidates (int) -> the number of parameters to try.
+        reduction (int) -> one in this many candidates go on to each round.
+        rounds (int) -> the number of simulations for each candidate in the
+                        first round.
+        seed (int) -> the seed for the candidates and destinations.
+        profile (MotionProfile) -> the elevators' motion profile.
+        maxTicks (int) -> the most ticks to run each simulation for.
+        processes (int) -> the number of worker processes (if not given, one
+                           for each CPU, and if 1, the simulations are run in
+                           this process).
+    """
+    if seed is None :
+        seed = random.randrange(2 ** 32)
+
+    parameters = sample_candidates(candidates, seed)
+    sketches = [LatencySketch() for _ in parameters]
+    pending = [0 for _ in parameters]
+    simulations = 0
+
+    # The defaults are kept as a baseline, even once they've been eliminated
+    alive = list(range(len(parameters)))
+    simulated = 0
+    needed = rounds
+
+    pool = nullcontext() if processes == 1 else ProcessPoolExecutor(processes)
+    with pool as executor :
+        while True :
+            tracked = alive if 0 in alive else alive + [0]
+
+            # Only the simulations the candidates haven't had yet are run
+            matches = [(candidate, GreedyPolicy(**parameters[candidate]),
+                        lowest, highest, cars, workloads[index % len(workloads)],
+                        seed + index, profile, maxTicks)
+                       for candidate in tracked
+                       for index in range(simulated, needed)]
+
+            if executor is None :
+                results = [play_match(*match) for match in matches]
+            else :
+                results = [future.result() for future in
+                           [executor.submit(play_match, *match)
+                            for match in matches]]
+
+            for candidate, sketch, _, _, left, _, _ in results :
+                sketches[candidate].merge(sketch)
+                pending[candidate] += left
+
+            simulations += len(matches)
+            simulated = needed
+
+            if len(alive) == 1 :
+                break
+
+            # Stop the weakest candidates early
+            alive.sort(key=lambda candidate : score(sketches[candidate],
+                                                    pending[candidate]))
+            alive = alive[:max(1, len(alive) // reduction)]
+
+            if len(alive) > 1 :
+                needed *= reduction
+
+    best = alive[0]
+    return {"key" : profile_key(lowest, highest, cars, profile),
+            "parameters" : parameters[best],
+            "wait_p90" : sketches[best].percentile(90),
+            "wait_mean" : sketches[best].get_mean(),
+            "pending" : pending[best],
+            "default_wait_p90" : sketches[0].percentile(90),
+            "default_wait_mean" : sketches[0].get_mean(),
+            "default_pending" : pending[0],
+            "candidates" : len(parameters),
+            "workloads" : simulated,
+            "simulations" : simulations,
+            "seed" : seed}
+
+
+def save_tuning(path, result) :
+    """Saves the result of a search, replacing any result for the same building
+    profile in the file.
+
+    Parameters:
+        path (str) -> the JSON file to save to.
+        result (Dict) -> the summary returned by tune.
+    """
+    tuned = {}
+    if os.path.exists(path) :
+        with open(path) as file :
+            tuned = json.load(file)
+
+    tuned[result["key"]] = result
+    with open(path, 'w') as file :
+        json.dump(tuned, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+def load_policy(path, key) :
+    """Returns a GreedyPolicy with the parameters saved for a building profile
+    (None if there aren't any).
+
+    Parameters:
+        path (str) -> the JSON file saved by save_tuning.
+        key (str) -> the building profile (see profile_key).
+    """
+    with open(path) as file :
+        tuned = json.load(file)
+
+    if key not in tuned :
+        return None
+
+    return GreedyPolicy(**tuned[key]["parameters"])
@@ -0,0 +1,155 @@
+## Workloads -> the requests made on each tick of a simulation, so exactly the
+## same requests can be run again (i.e. to compare dispatch policies, or the
+## number of elevators).
+##
+## Saved as one "tick,height,direction" line for each request, after a header
+## line with the settings the workload was recorded with
+## ("# lowest=-2,highest=2,cars=2,seed=1").
+
+import random
+from time import perf_counter
+
+
+# Constants
+DRAIN_TICKS = 100000 # the most ticks to finish the requests after the workload
+HEADER = "# " # starts the line of settings a workload was recorded with
+
+
+def generate_workload(building, steps, requests, seed=None) :
+    """Returns a random workload, as a list of (tick, height, direction).
+
+    Parameters:
+        building (Building) -> the building the requests are made in.
+        steps (int) -> the number of ticks to make requests for.
+        requests (int) -> the number of requests to make each tick.
+        seed (int) -> the seed for choosing the requests.
+    """
+    generator = random.Random(seed)
+    heights = building.get_heights()
+
+    workload = []
+    for tick in range(steps) :
+        for _ in range(requests) :
+            height = generator.choice(heights)
+
+            # Only valid directions for the floor chosen
+            if height == building.get_highest() :
+                direction = 'D'
+            elif height == building.get_lowest() :
+                direction = 'U'
+            else :
+                direction = generator.choice(('D', 'U'))
+
+            workload.append((tick, height, direction))
+
+    return workload
+
+
+def save_workload(path, workload, settings=None) :
+    """Saves a workload to a file.
+
+    Parameters:
+        path (str) -> the file to save to.
+        workload (List<Tuple>) -> the (tick, height, direction) of each request.
+        settings (Dict<str:int>) -> the settings the workload was made with
+                                    (i.e. lowest, highest, cars and seed).
+    """
+    with open(path, 'w') as file :
+        if settings :
+            file.write(HEADER + ",".join("{}={}".format(name, value)
+                                         for name, value in settings.items()) +
+                       "\n")
+
+        for tick, height, direction in workload :
+            file.write("{},{},{}\n".format(tick, height, direction))
+
+
+def load_workload(path) :
+    """Returns the workload saved in a file.
+
+    Parameters:
+        path (str) -> the file to load from.
+    """
+    workload = []
+    with open(path) as file :
+        for line in file :
+            if line.strip() and not line.startswith(HEADER) :
+                tick, height, direction = line.strip().split(',')
+                workload.append((int(tick), int(height), direction))
+
+    return workload
+
+
+def load_settings(path) :
+    """Returns the settings a workload was saved with (empty if it was saved
+    without any).
+
+    Parameters:
+        path (str) -> the file to load from.
+    """
+    with open(path) as file :
+        line = file.readline()
+
+    settings = {}
+    if line.startswith(HEADER) :
+        for setting in line[len(HEADER):].strip().split(',') :
+            name, value = setting.split('=')
+            settings[name] = int(value)
+
+    return settings
+
+
+def check_workload(building, workload) :
+    """Returns the heights of the requests in a workload which aren't floors of
+    a building (lowest first).
+
+    Parameters:
+        building (Building) -> the building the workload is run in.
+        workload (List<Tuple>) -> the (tick, height, direction) of each request.
+    """
+    return sorted({height for _, height, _ in workload
+                   if height not in building.get_levels()})
+
+
+def run_workload(system, workload, maxTicks=None, times=None) :
+    """Makes the requests in a workload on their ticks, then ticks the system
+    until every request has been completed.
+
+    Returns the number of ticks the system ran for.
+
+    Parameters:
+        system (TransportSystem) -> the system to run.
+        workload (List<Tuple>) -> the (tick, height, direction) of each request.
+        maxTicks (int) -> the most ticks to run for (if not given, DRAIN_TICKS
+                          after the last request).
+        times (List<float>) -> if given, the time (in seconds) each tick takes
+                               is added to it.
+    """
+    workload = sorted(workload, key=lambda request : request[0])
+    if maxTicks is None :
+        maxTicks = (workload[-1][0] + 1 if workload else 0) + DRAIN_TICKS
+
+    start = system.get_ticks()
+    index = 0
+    while system.get_ticks() - start < maxTicks :
+        tick = system.get_ticks() - start
+
+        # Requests for this tick
+        while index < len(workload) and workload[index][0] <= tick :
+            _, height, direction = workload[index]
+            system.add_request({height : 1}, direction)
+            index += 1
+
+        # Finished once every request has been made and completed
+        if index == len(workload) and not system.requests and \
+           system.is_solved() :
+            break
+
+        if times is None :
+            system.tick()
+        else :
+            tickStart = perf_counter()
+            system.tick()
+            times.append(perf_counter() - tickStart)
+
+    return system.get_ticks() - start